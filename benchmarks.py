@@ -0,0 +1,933 @@
+# benchmarks.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Performance benchmarks for the game engine and the search agents.
+
+USAGE:      python benchmarks.py <benchmark> [<benchmark> ...] <options>
+EXAMPLES:   python benchmarks.py grid
+            python benchmarks.py grid --layouts originalClassic,maze-61x61
+            python benchmarks.py codec --layouts mediumClassic,maze-61x61
+            python benchmarks.py memory --layouts mediumClassic@4 --depths 3
+            python benchmarks.py memory --layouts mediumClassic --depths 4
+            python benchmarks.py search -p AlphaBetaAgent -a tt=True --layouts smallClassic
+            python benchmarks.py parallel -p AlphaBetaAgent --layouts mediumClassic --depths 4
+            python benchmarks.py play -p AlphaBetaAgent -a tt=True,reuse=True --layouts mediumClassic
+            python benchmarks.py versus --layouts mediumClassic --depths 2,3 --moves 1000
+            python benchmarks.py star --depths 2,3
+            python benchmarks.py freeze --layouts originalClassic --depths 2,3
+
+Layout names of the form maze-<width>x<height> are generated on the fly
+(see generateMaze), so engine costs can be measured on boards larger
+than the ones shipped in layouts/.  A @<k> suffix (mediumClassic@4)
+adds ghosts to a layout until it has k of them.
+"""
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import ghostAgents
+import layout
+import multiAgents
+import pacman
+from game import reconstituteGrid
+from pacman import GameState
+
+
+def generateMaze(width, height, numGhosts=4, seed=0):
+    """
+    Returns the text of a random maze layout: a depth-first carved maze with
+    a few extra openings (so it has cycles), food on every free cell, Pacman
+    in the bottom left corner and ghosts in the other corners.
+    """
+    rng = random.Random(seed)
+    width, height = width | 1, height | 1  # Walls on even cells, corridors on odd ones
+    cells = [['%' for x in range(width)] for y in range(height)]
+    stack = [(1, 1)]
+    cells[1][1] = '.'
+    while stack:
+        x, y = stack[-1]
+        neighbors = [(x + dx, y + dy, dx, dy) for dx, dy in [(2, 0), (-2, 0), (0, 2), (0, -2)]
+                     if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and cells[y + dy][x + dx] == '%']
+        if not neighbors:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rng.choice(neighbors)
+        cells[y + dy // 2][x + dx // 2] = '.'
+        cells[ny][nx] = '.'
+        stack.append((nx, ny))
+    for i in range(width * height // 20):
+        x, y = rng.randrange(1, width - 1), rng.randrange(1, height - 1)
+        cells[y][x] = '.'
+    corners = [(1, 1), (width - 2, height - 2), (width - 2, 1), (1, height - 2)]
+    x, y = corners[0]
+    cells[y][x] = 'P'
+    for i in range(numGhosts):
+        x, y = corners[1 + i % 3]
+        cells[y][x] = 'G'
+    return [''.join(row) for row in cells]
+
+
+def addGhosts(layoutText, numGhosts):
+    """
+    Returns a copy of the layout text with ghosts added on empty cells (the
+    ghost house on the classic layouts), then on food, until it has numGhosts.
+    """
+    rows = [list(row) for row in layoutText]
+    for free in [' ', '.']:
+        for row in rows:
+            for x, cell in enumerate(row):
+                if sum(r.count('G') for r in rows) >= numGhosts:
+                    return [''.join(row) for row in rows]
+                if cell == free:
+                    row[x] = 'G'
+    return [''.join(row) for row in rows]
+
+
+def getBenchmarkLayout(name, bitboards=False):
+    numGhosts = None
+    if '@' in name:
+        name, numGhosts = name.split('@')
+    if name.startswith('maze-'):
+        width, height = [int(n) for n in name[len('maze-'):].split('x')]
+        lay = layout.Layout(generateMaze(width, height), bitboards)
+    else:
+        lay = layout.getLayout(name, bitboards=bitboards)
+    if lay == None:
+        raise Exception("The layout " + name + " cannot be found")
+    if numGhosts is not None:
+        lay = layout.Layout(addGhosts(lay.layoutText, int(numGhosts)), bitboards)
+    return lay
+
+
+def getInitialState(lay, numGhosts=1000):
+    state = GameState()
+    state.initialize(lay, numGhosts)
+    return state
+
+
+def timePerCall(function, minTime=0.2, repeat=3):
+    """
+    Calls function repeatedly for at least minTime seconds and returns the
+    mean number of seconds per call, the best of repeat such runs.
+    """
+    best = None
+    for run in range(repeat):
+        calls, start = 0, time.perf_counter()
+        while True:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= minTime:
+                break
+        if best is None or elapsed / calls < best:
+            best = elapsed / calls
+    return best
+
+
+def randomPlayout(state, numMoves, seed=0):
+    """
+    Returns the (state, agentIndex, action) moves of a random playout, every
+    agent moving uniformly at random, of at most numMoves moves.
+    """
+    rng = random.Random(seed)
+    moves = []
+    agentIndex = 0
+    for i in range(numMoves):
+        if state.isWin() or state.isLose():
+            break
+        action = rng.choice(state.getLegalActions(agentIndex))
+        moves.append((state, agentIndex, action))
+        state = state.getNextState(agentIndex, action)
+        agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return moves
+
+
+class CallCounter:
+    """
+    Counts the calls of a method while active (with CallCounter(GameState,
+    'getNextState') as counter: ... counter.calls).
+    """
+
+    def __init__(self, cls, name):
+        self.cls, self.name, self.calls = cls, name, 0
+
+    def __enter__(self):
+        method = self.original = getattr(self.cls, self.name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return method(*args, **kwargs)
+        setattr(self.cls, self.name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        setattr(self.cls, self.name, self.original)
+
+
+def peakRSS():
+    """
+    Returns the peak resident set size of the process in MiB, or None where
+    the resource module is not available.
+    """
+    if resource is None:
+        return None
+    maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return maxRSS / 2.0 ** 20  # Bytes on macOS, kilobytes elsewhere
+    return maxRSS / 2.0 ** 10
+
+
+def printTable(header, rows):
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+
+
+###################
+# The benchmarks  #
+###################
+
+
+def benchmarkGrid(options):
+    """
+    Grid (list of lists) against BitGrid (one int) on the food and walls of
+    each layout: copy, count, asList, hash, cell reads, and the resulting
+    cost of a getNextState.
+    """
+    rows = []
+    for name in options.layouts:
+        for bitboards in [False, True]:
+            lay = getBenchmarkLayout(name, bitboards)
+            food, walls = lay.food, lay.walls
+            cells = [(x, y) for x in range(walls.width) for y in range(walls.height)]
+            moves = randomPlayout(getInitialState(lay, options.numGhosts), 200)
+
+            def readCells():
+                for x, y in cells:
+                    walls[x][y]
+
+            def nextStates():
+                for s, agentIndex, action in moves:
+                    s.getNextState(agentIndex, action)
+            rows.append([name, type(food).__name__,
+                         '%.2f' % (timePerCall(food.copy) * 1e6),
+                         '%.2f' % (timePerCall(food.count) * 1e6),
+                         '%.2f' % (timePerCall(food.asList) * 1e6),
+                         '%.2f' % (timePerCall(lambda: hash(food)) * 1e6),
+                         '%.3f' % (timePerCall(readCells) / len(cells) * 1e6),
+                         '%.2f' % (timePerCall(nextStates) / len(moves) * 1e6)])
+    print('Times in microseconds (per cell for reads, per child for getNextState)')
+    printTable(['layout', 'grid', 'copy', 'count', 'asList', 'hash', 'read', 'getNextState'], rows)
+
+
+def benchmarkBudget(options):
+    """
+    options.agent with each node budget of options.budgets (agent option
+    maxNodes) playing a game against random ghosts (seeded) for at most
+    options.moves Pacman moves, twice: per move, the children generated,
+    the depth reached and the milliseconds spent (mean and extremes), and
+    whether the second game repeats the first move for move.
+    """
+    rows = []
+    for name in options.layouts:
+        for maxNodes in options.budgets:
+            games = []
+            for repeat in range(2):
+                random.seed(0)
+                agent = getattr(multiAgents, options.agent)(maxNodes=str(maxNodes), **options.agentArgs)
+                moves = []
+
+                def recordMove():
+                    moves.append((agent.generated, agent.depthReached, agent.searchTime))
+                playGame(agent, getInitialState(getBenchmarkLayout(name), options.numGhosts), 'random',
+                         options.moves, recordMove)
+                games.append(moves)
+            generated, depths, times = zip(*games[0])
+            rows.append([name, maxNodes, len(generated), '%.0f' % (sum(generated) / len(generated)),
+                         max(generated), '%.1f' % (sum(depths) / len(depths)), '%d-%d' % (min(depths), max(depths)),
+                         '%.1f' % (sum(times) / len(times) * 1e3), '%.1f' % (max(times) * 1e3),
+                         [move[:2] for move in games[0]] == [move[:2] for move in games[1]]])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'maxNodes', 'moves', 'children', 'max children', 'depth', 'depths', 'ms/move',
+                'max ms', 'reproducible'], rows)
+
+
+def benchmarkCodec(options):
+    """
+    GameState.encode/decode against pickle on the states of a random playout
+    of each layout: microseconds per state and bytes per state.  Also checks
+    that every state survives the round trip (same state, key and encoding)
+    and that Grid.packBits round-trips the food.
+    """
+    rows = []
+    for name in options.layouts:
+        for bitboards in [False, True]:
+            lay = getBenchmarkLayout(name, bitboards)
+            states = [s for s, agentIndex, action in
+                      randomPlayout(getInitialState(lay, options.numGhosts), 200)]
+            encoded = [s.encode() for s in states]
+            pickled = [pickle.dumps(s, pickle.HIGHEST_PROTOCOL) for s in states]
+            for state, data in zip(states, encoded):
+                decoded = GameState.decode(data)
+                if decoded != state or decoded.getKey() != state.getKey() or decoded.encode() != data:
+                    raise Exception('GameState does not survive encode/decode on ' + name)
+                if reconstituteGrid(state.data.food.packBits()).data != state.data.food.data:
+                    raise Exception('Food does not survive packBits on ' + name)
+
+            def encodeAll():
+                for s in states:
+                    s.encode()
+
+            def decodeAll():
+                for data in encoded:
+                    GameState.decode(data)
+
+            def dumpAll():
+                for s in states:
+                    pickle.dumps(s, pickle.HIGHEST_PROTOCOL)
+
+            def loadAll():
+                for data in pickled:
+                    pickle.loads(data)
+            rows.append([name, type(lay.food).__name__, len(states),
+                         '%.2f' % (timePerCall(encodeAll) / len(states) * 1e6),
+                         '%.2f' % (timePerCall(decodeAll) / len(states) * 1e6),
+                         '%.0f' % (sum(map(len, encoded)) / len(states)),
+                         '%.2f' % (timePerCall(dumpAll) / len(states) * 1e6),
+                         '%.2f' % (timePerCall(loadAll) / len(states) * 1e6),
+                         '%.0f' % (sum(map(len, pickled)) / len(states))])
+    print('Times in microseconds per state, sizes in bytes per state; round trips checked')
+    printTable(['layout', 'grid', 'states', 'encode', 'decode', 'bytes', 'pickle dumps', 'pickle loads',
+                'pickle bytes'], rows)
+
+
+def benchmarkRules(options):
+    """
+    The game rules along a random playout of each layout: legal actions of
+    Pacman and of the ghosts, and getNextState with and without validation
+    of the action (the search agents do not validate).
+    """
+    rows = []
+    for name in options.layouts:
+        moves = randomPlayout(getInitialState(getBenchmarkLayout(name), options.numGhosts), 400)
+        pacmanMoves = [move for move in moves if move[1] == 0]
+        ghostMoves = [move for move in moves if move[1] != 0]
+
+        def legalActions(moves):
+            for s, agentIndex, action in moves:
+                s.getLegalActions(agentIndex)
+
+        def nextStates(validate):
+            for s, agentIndex, action in moves:
+                s.getNextState(agentIndex, action, validate)
+        validated = timePerCall(lambda: nextStates(True)) / len(moves) * 1e6
+        unchecked = timePerCall(lambda: nextStates(False)) / len(moves) * 1e6
+        rows.append([name,
+                     '%.2f' % (timePerCall(lambda: legalActions(pacmanMoves)) / len(pacmanMoves) * 1e6),
+                     '%.2f' % (timePerCall(lambda: legalActions(ghostMoves)) / len(ghostMoves) * 1e6),
+                     '%.2f' % validated, '%.2f' % unchecked, '%.2f' % (validated - unchecked)])
+    print('Times in microseconds per call')
+    printTable(['layout', 'pacman legal', 'ghost legal', 'getNextState', 'unchecked', 'saved'], rows)
+
+
+def benchmarkMemory(options):
+    """
+    One search of options.agent from the initial state of each layout: time,
+    number of children generated, distinct states explored, and peak traced
+    memory per child and in total.  The timed and traced searches run with
+    the explored tracker chosen by --tracker.
+
+    The peak RSS column is the process-wide high-water mark so far, so it is
+    only meaningful for the largest search (run one layout and depth per
+    process to compare runs).
+    """
+    rows = []
+    for name in options.layouts:
+        state = getInitialState(getBenchmarkLayout(name), options.numGhosts)
+        for depth in options.depths:
+            agent = getattr(multiAgents, options.agent)(depth=str(depth), **options.agentArgs)
+            GameState.setExploredTracker(pacman.ExploredCounter())
+            with CallCounter(GameState, '_applyMove') as counter:  # Once per child, however made
+                agent.getAction(state)
+            children = counter.calls
+            numStates = len(GameState.getAndResetExplored())
+
+            GameState.setExploredTracker(TRACKERS[options.tracker]())
+            start = time.perf_counter()
+            agent.getAction(state)
+            elapsed = time.perf_counter() - start
+            GameState.getAndResetExplored()
+            tracemalloc.start()
+            agent.getAction(state)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            GameState.setExploredTracker(None)
+            rss = peakRSS()
+            rows.append([name, state.getNumAgents() - 1, depth, children, numStates,
+                         '%.2f' % elapsed, '%.1f' % (elapsed / children * 1e6),
+                         '%d' % (peak / children), '%.1f' % (peak / 2.0 ** 20),
+                         '-' if rss is None else '%.1f' % rss])
+    print('%s %s, tracker: %s' % (options.agent, options.agentArgs, options.tracker))
+    printTable(['layout', 'ghosts', 'depth', 'children', 'distinct', 'seconds', 'us/child',
+                'bytes/child', 'peak MiB', 'peak RSS MiB'], rows)
+
+
+def getSearchPositions(lay, numGhosts, numPositions, seed=0):
+    """
+    Returns numPositions states with Pacman to move, taken every few moves
+    of a random playout on the layout.
+    """
+    moves = randomPlayout(getInitialState(lay, numGhosts), 40 * numPositions, seed)
+    positions = [s for s, agentIndex, action in moves if agentIndex == 0]
+    return positions[::4][:numPositions]
+
+
+def benchmarkSearch(options):
+    """
+    options.agent searching positions of a random playout of each layout:
+    nodes per second, cutoffs per node and transposition table hit rate, for
+    the agents that count them (nodes, cutoffs and tt attributes).
+    """
+    rows = []
+    for name in options.layouts:
+        positions = getSearchPositions(getBenchmarkLayout(name), options.numGhosts, options.positions)
+        for depth in options.depths:
+            agent = getattr(multiAgents, options.agent)(depth=str(depth), **options.agentArgs)
+            nodes = cutoffs = probes = hits = 0
+            elapsed = 0.0
+            for state in positions:
+                start = time.perf_counter()
+                agent.getAction(state)
+                elapsed += time.perf_counter() - start
+                nodes += getattr(agent, 'nodes', 0)
+                cutoffs += getattr(agent, 'cutoffs', 0)
+                tt = getattr(agent, 'tt', None)
+                if tt is not None:
+                    probes += tt.probes
+                    hits += tt.hits
+            rows.append([name, depth, len(positions), nodes, '%.2f' % elapsed,
+                         '%.0f' % (nodes / elapsed), '%.3f' % (cutoffs / max(nodes, 1)),
+                         '%.3f' % (hits / probes) if probes else '-'])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'depth', 'positions', 'nodes', 'seconds', 'nodes/s', 'cutoffs/node',
+                'tt hit rate'], rows)
+
+
+def benchmarkParallel(options):
+    """
+    options.agent searching the same positions with the root split over
+    1, 2, 4, 8 processes (agent option workers): time, speedup over the first
+    worker count, nodes searched by all the processes, and whether the chosen
+    moves are those of the first count.  Process counts above 1 are run with
+    and without the alpha shared between processes (agent option shareAlpha),
+    so the cutoffs it brings show up in the node counts.
+    Each persistent process pool is started before timing.
+    """
+    rows = []
+    for name in options.layouts:
+        positions = getSearchPositions(getBenchmarkLayout(name), options.numGhosts, options.positions)
+        for depth in options.depths:
+            baseline = None
+            for workers in options.workers:
+                for shareAlpha in ((True, False) if workers > 1 else (True,)):
+                    agent = getattr(multiAgents, options.agent)(depth=str(depth), workers=str(workers),
+                                                                shareAlpha=str(shareAlpha), **options.agentArgs)
+                    agent.getAction(positions[0])
+                    nodes = 0
+                    moves = []
+                    start = time.perf_counter()
+                    for state in positions:
+                        moves.append(agent.getAction(state))
+                        nodes += agent.nodes
+                    elapsed = time.perf_counter() - start
+                    if baseline is None:
+                        baseline = elapsed, moves
+                    rows.append([name, depth, workers, shareAlpha if workers > 1 else '-', nodes,
+                                 '%.2f' % elapsed, '%.2f' % (baseline[0] / elapsed), moves == baseline[1]])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'depth', 'workers', 'shared alpha', 'nodes', 'seconds', 'speedup', 'same moves'], rows)
+
+
+GHOSTS = {
+    'random': ghostAgents.RandomGhost,
+    'directional': ghostAgents.DirectionalGhost,
+}
+
+
+def playGame(agent, state, ghostType, maxMoves, afterMove=None):
+    """
+    Plays agent against ghosts of ghostType (a key of GHOSTS) from state,
+    for at most maxMoves Pacman moves, calling afterMove() after each
+    getAction.  The ghosts draw from the random module.  Returns the seconds
+    spent in each getAction and the final state.
+    """
+    ghosts = [GHOSTS[ghostType](index) for index in range(1, state.getNumAgents())]
+    times = []
+    while len(times) < maxMoves and not (state.isWin() or state.isLose()):
+        start = time.perf_counter()
+        action = agent.getAction(state)
+        times.append(time.perf_counter() - start)
+        if afterMove is not None:
+            afterMove()
+        state = state.getNextState(0, action)
+        for ghost in ghosts:
+            if state.isWin() or state.isLose():
+                break
+            state = state.getNextState(ghost.index, ghost.getAction(state))
+    return times, state
+
+
+def benchmarkVersus(options):
+    """
+    MCTSAgent, with each iteration budget of options.iterations, against
+    ExpectimaxAgent at each of options.depths: options.games games per
+    setting and layout against options.ghosts ghosts (game g seeded with g),
+    reporting win rate, mean score and milliseconds per move.  Games still
+    running after options.moves Pacman moves count as lost.  options.agentArgs
+    go to MCTSAgent (e.g. ghostModel=directional).
+    """
+    settings = [('ExpectimaxAgent', {'depth': str(depth)}) for depth in options.depths]
+    settings += [('MCTSAgent', dict(options.agentArgs, iterations=str(iterations)))
+                 for iterations in options.iterations]
+    rows = []
+    for name in options.layouts:
+        for agentName, agentArgs in settings:
+            wins, scores, times = 0, [], []
+            for game in range(options.games):
+                random.seed(game)
+                if agentName == 'MCTSAgent':
+                    agentArgs = dict(agentArgs, seed=str(game))
+                agent = getattr(multiAgents, agentName)(**agentArgs)
+                gameTimes, state = playGame(agent, getInitialState(getBenchmarkLayout(name), options.numGhosts),
+                                            options.ghosts, options.moves)
+                wins += state.isWin()
+                scores.append(state.getScore())
+                times += gameTimes
+            setting = ','.join('%s=%s' % item for item in sorted(agentArgs.items()) if item[0] != 'seed')
+            rows.append([name, agentName, setting, options.games, '%.2f' % (wins / options.games),
+                         '%.1f' % (sum(scores) / len(scores)), '%.1f' % (sum(times) / len(times) * 1e3)])
+    print('Against %s ghosts' % options.ghosts)
+    printTable(['layout', 'agent', 'options', 'games', 'win rate', 'mean score', 'ms/move'], rows)
+
+
+def getQ4Problems(options):
+    """
+    Yields (name, depth, states, evaluation function, is a game tree) for
+    the q4 test cases: its game trees (evaluation bounds: the extreme leaf
+    values), and positions of a random playout of the layouts of its Pacman
+    games at each of options.depths.
+    """
+    import glob
+    import multiagentTestClasses
+    import testParser
+    for path in sorted(glob.glob('test_cases/q4/*.test')):
+        testDict = testParser.TestParser(path).parse()
+        name = path.split('/')[-1][:-len('.test')]
+        if testDict['class'] == 'GraphGameTreeTest':
+            problem = multiagentTestClasses.parseTreeProblem(testDict)
+
+            def treeEvaluation(state):
+                return state.getScore()
+            treeEvaluation.bounds = (min(problem.evaluation.values()), max(problem.evaluation.values()))
+            yield name, int(testDict['depth']), [problem.startState], treeEvaluation, True
+        elif testDict['class'] == 'PacmanGameTreeTest':
+            lay = layout.Layout([line.strip() for line in testDict['layout'].split('\n') if line.strip()])
+            positions = getSearchPositions(lay, options.numGhosts, options.positions)
+            for depth in options.depths:
+                yield ('%s (%d positions)' % (name, len(positions)), depth, positions,
+                       multiAgents.scoreEvaluationFunction, False)
+
+
+def benchmarkStar(options):
+    """
+    ExpectimaxAgent without pruning (star=0) against Star1 on the q4 test
+    cases (see getQ4Problems; the Pacman games use the bounds of
+    multiAgents.scoreEvaluationBounds).  Nodes visited, seconds, and a check
+    that both choose the same actions.
+    """
+    rows = []
+    for name, depth, states, evaluationFunction, isTree in getQ4Problems(options):
+        nodes, seconds, actions = [], [], []
+        for star in [0, 1]:
+            agent = multiAgents.ExpectimaxAgent(depth=str(depth), star=str(star))
+            agent.evaluationFunction = evaluationFunction
+            count, start, chosen = 0, time.perf_counter(), []
+            for state in states:
+                chosen.append(agent.getAction(state))
+                count += agent.nodes
+            seconds.append(time.perf_counter() - start)
+            nodes.append(count)
+            actions.append(chosen)
+        if actions[1] != actions[0]:
+            raise Exception('Star pruning changed the actions on ' + name)
+        rows.append([name, depth] + nodes + ['%.2f' % (nodes[1] / nodes[0])] + ['%.3f' % s for s in seconds])
+    print('Nodes visited, seconds; both choose the same actions')
+    printTable(['test', 'depth', 'nodes', 'star1', 'star1/nodes', 'seconds', 'star1 s'], rows)
+
+
+def benchmarkEpsilon(options):
+    """
+    ExpectimaxAgent with each threshold of options.epsilons against the full
+    search (epsilon=0) on the q4 test cases (see getQ4Problems), the Pacman
+    games modelling options.ghosts ghosts (ghostModel) and the game trees
+    uniform ones: nodes visited, part of the nodes saved, how many actions
+    agree with the full search, and mean probability discarded per search.
+    """
+    rows = []
+    for name, depth, states, evaluationFunction, isTree in getQ4Problems(options):
+        ghostModel = 'random' if isTree else options.ghosts
+        baseline = None
+        for epsilon in [0] + options.epsilons:
+            agent = multiAgents.ExpectimaxAgent(depth=str(depth), ghostModel=ghostModel, epsilon=str(epsilon))
+            agent.evaluationFunction = evaluationFunction
+            nodes, discarded, chosen = 0, 0.0, []
+            for state in states:
+                chosen.append(agent.getAction(state))
+                nodes += agent.nodes
+                discarded += agent.discardedMass
+            if baseline is None:
+                baseline = nodes, chosen
+                continue
+            rows.append([name, depth, ghostModel, epsilon, baseline[0], nodes, '%.2f' % (1 - nodes / baseline[0]),
+                         '%d/%d' % (sum(a == b for a, b in zip(chosen, baseline[1])), len(chosen)),
+                         '%.4f' % (discarded / len(states))])
+    printTable(['test', 'depth', 'ghosts', 'epsilon', 'nodes', 'epsilon nodes', 'saved', 'same actions',
+                'discarded'], rows)
+
+
+def benchmarkFreeze(options):
+    """
+    options.agent with and without freezeGhosts (options.agentArgs apply to
+    both; e.g. freezeMargin=2) on positions of a random playout of each
+    layout with each of options.ghostCounts ghosts: children generated,
+    seconds, speedup, and how many positions get the same move.
+    """
+    rows = []
+    for name in options.layouts:
+        for numGhosts in options.ghostCounts:
+            positions = getSearchPositions(getBenchmarkLayout('%s@%d' % (name, numGhosts)), numGhosts,
+                                           options.positions)
+            for depth in options.depths:
+                results = []
+                for freeze in ['False', 'True']:
+                    agent = getattr(multiAgents, options.agent)(depth=str(depth), freezeGhosts=freeze,
+                                                                **options.agentArgs)
+                    with CallCounter(GameState, '_applyMove') as counter:
+                        start = time.perf_counter()
+                        moves = [agent.getAction(state) for state in positions]
+                        elapsed = time.perf_counter() - start
+                    results.append((counter.calls, elapsed, moves))
+                (children, elapsed, moves), (frozenChildren, frozenElapsed, frozenMoves) = results
+                rows.append([name, numGhosts, depth, children, frozenChildren, '%.2f' % elapsed,
+                             '%.2f' % frozenElapsed, '%.2f' % (elapsed / frozenElapsed),
+                             '%d/%d' % (sum(a == b for a, b in zip(moves, frozenMoves)), len(moves))])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'ghosts', 'depth', 'children', 'frozen', 'seconds', 'frozen s', 'speedup',
+                'same moves'], rows)
+
+
+def benchmarkJoint(options):
+    """
+    options.agent with and without jointGhosts on positions of a random
+    playout of each layout with each of options.ghostCounts ghosts: Pacman
+    nodes searched (calls to maximise), children generated, joint outcomes
+    merged with another, seconds, and how many positions get the same move.
+    """
+    rows = []
+    for name in options.layouts:
+        for numGhosts in options.ghostCounts:
+            positions = getSearchPositions(getBenchmarkLayout('%s@%d' % (name, numGhosts)), numGhosts,
+                                           options.positions)
+            for depth in options.depths:
+                results = []
+                for joint in ['False', 'True']:
+                    agent = getattr(multiAgents, options.agent)(depth=str(depth), jointGhosts=joint,
+                                                                **options.agentArgs)
+                    with CallCounter(type(agent), 'maximise') as nodes, \
+                            CallCounter(GameState, '_applyMove') as children:
+                        start = time.perf_counter()
+                        moves = [agent.getAction(state) for state in positions]
+                        elapsed = time.perf_counter() - start
+                    results.append((nodes.calls, children.calls, elapsed, moves))
+                (nodes, children, elapsed, moves), (jointNodes, jointChildren, jointElapsed, jointMoves) = results
+                rows.append([name, numGhosts, depth, nodes, jointNodes, '%.3f' % (jointNodes / nodes),
+                             children, jointChildren, '%d/%d' % (agent.jointMerged, agent.jointOutcomes),
+                             '%.2f' % elapsed, '%.2f' % jointElapsed,
+                             '%d/%d' % (sum(a == b for a, b in zip(moves, jointMoves)), len(moves))])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'ghosts', 'depth', 'nodes', 'joint', 'joint/nodes', 'children', 'joint children',
+                'merged', 'seconds', 'joint s', 'same moves'], rows)
+
+
+def benchmarkFactor(options):
+    """
+    ExpectimaxAgent with and without factorGhosts (options.agentArgs apply to
+    both) playing options.games games per setting against random ghosts, with
+    each of options.ghostCounts ghosts and for at most options.moves Pacman
+    moves (game g seeded with g): children generated, milliseconds per move,
+    speedup, and how many games are played the same (moves and score).
+    """
+    rows = []
+    for name in options.layouts:
+        for numGhosts in options.ghostCounts:
+            lay = getBenchmarkLayout('%s@%d' % (name, numGhosts))
+            for depth in options.depths:
+                results = []
+                for factor in ['False', 'True']:
+                    games, times = [], []
+                    with CallCounter(GameState, '_applyMove') as children:
+                        for game in range(options.games):
+                            random.seed(game)
+                            agent = multiAgents.ExpectimaxAgent(depth=str(depth), factorGhosts=factor,
+                                                                **options.agentArgs)
+                            gameTimes, state = playGame(agent, getInitialState(lay, numGhosts), 'random',
+                                                        options.moves)
+                            games.append((len(gameTimes), state.getScore()))
+                            times += gameTimes
+                    results.append((children.calls, sum(times) / len(times), games))
+                (children, perMove, games), (factorChildren, factorPerMove, factorGames) = results
+                rows.append([name, numGhosts, depth, children, factorChildren, '%.1f' % (perMove * 1e3),
+                             '%.1f' % (factorPerMove * 1e3), '%.2f' % (perMove / factorPerMove),
+                             '%d/%d' % (sum(a == b for a, b in zip(games, factorGames)), len(games))])
+    print('ExpectimaxAgent %s against random ghosts' % options.agentArgs)
+    printTable(['layout', 'ghosts', 'depth', 'children', 'factored', 'ms/move', 'factored ms', 'speedup',
+                'same games'], rows)
+
+
+class UncachedDistributionTable(ghostAgents.DistributionTable):
+    """
+    Calls DirectionalGhost.getDistribution at every node, as the search
+    would without the table.
+    """
+
+    def getDistribution(self, state, index):
+        dist = ghostAgents.DirectionalGhost(index).getDistribution(state)
+        return [dist[a] for a in state.getLegalActions(index)]
+
+
+def benchmarkModel(options):
+    """
+    ExpectimaxAgent with uniform ghosts (ghostModel=random), then weighting
+    the ghost actions by DirectionalGhost through its cached distribution
+    table, then calling getDistribution at every node, on positions of a
+    random playout of each layout: nodes, seconds and nodes per second, also
+    relative to the uniform search.
+    """
+    rows = []
+    for name in options.layouts:
+        lay = getBenchmarkLayout(name)
+        positions = getSearchPositions(lay, options.numGhosts, options.positions)
+        for depth in options.depths:
+            baseline = None
+            for setting, ghostModel in [('uniform', 'random'), ('cached', 'directional'),
+                                        ('getDistribution', 'directional')]:
+                agent = multiAgents.ExpectimaxAgent(depth=str(depth), ghostModel=ghostModel, **options.agentArgs)
+                if setting == 'getDistribution':
+                    agent.ghostTable = UncachedDistributionTable(None)
+                    agent.ghostTableLayout = lay.getLayoutId()
+                nodes, elapsed = 0, 0.0
+                for state in positions:
+                    start = time.perf_counter()
+                    agent.getAction(state)
+                    elapsed += time.perf_counter() - start
+                    nodes += agent.nodes
+                if baseline is None:
+                    baseline = nodes / elapsed
+                rows.append([name, depth, setting, nodes, '%.2f' % elapsed, '%.0f' % (nodes / elapsed),
+                             '%.2f' % (nodes / elapsed / baseline)])
+    print('ExpectimaxAgent %s' % options.agentArgs)
+    printTable(['layout', 'depth', 'ghosts', 'nodes', 'seconds', 'nodes/s', 'vs uniform'], rows)
+
+
+def benchmarkStats(options):
+    """
+    options.agent searching positions of a random playout of each layout
+    without statistics, with them (agent option stats), and with them
+    written to a JSON lines file after each move (statsFile, flushStats as
+    Game.run does): seconds, overhead over the search without statistics,
+    and the totals of the recorded statistics.
+    """
+    rows = []
+    for name in options.layouts:
+        positions = getSearchPositions(getBenchmarkLayout(name), options.numGhosts, options.positions)
+        for depth in options.depths:
+            baseline = None
+            for setting in ['none', 'stats', 'statsFile']:
+                with tempfile.TemporaryDirectory() as directory:
+                    agentArgs = dict(options.agentArgs)
+                    if setting == 'stats':
+                        agentArgs['stats'] = 'True'
+                    elif setting == 'statsFile':
+                        agentArgs['statsFile'] = os.path.join(directory, 'stats.jsonl')
+                    agent = getattr(multiAgents, options.agent)(depth=str(depth), **agentArgs)
+                    nodes = evaluations = 0
+                    generationTime = 0.0
+                    start = time.perf_counter()
+                    for state in positions:
+                        agent.getAction(state)
+                        agent.flushStats()
+                        if agent.stats is not None:
+                            nodes += sum(agent.stats.nodesPerDepth)
+                            evaluations += agent.stats.evaluations
+                            generationTime += agent.stats.generationTime
+                    elapsed = time.perf_counter() - start
+                    agent.final(None)
+                if baseline is None:
+                    baseline = elapsed
+                rows.append([name, depth, setting, '%.2f' % elapsed, '%+.1f%%' % ((elapsed / baseline - 1) * 100),
+                             nodes or '-', evaluations or '-', '%.2f' % generationTime if nodes else '-'])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'depth', 'statistics', 'seconds', 'overhead', 'nodes', 'evaluations',
+                'generation s'], rows)
+
+
+def benchmarkPlay(options):
+    """
+    options.agent playing a game against random ghosts (seeded, so runs with
+    different agent options face the same ghost moves as long as Pacman plays
+    the same) for at most options.moves Pacman moves: milliseconds per move,
+    and for agents with a transposition table its hit rate and the part of
+    the probes answered by entries of a previous move (tt.reuses).
+    """
+    rows = []
+    for name in options.layouts:
+        for depth in options.depths:
+            random.seed(0)
+            agent = getattr(multiAgents, options.agent)(depth=str(depth), **options.agentArgs)
+            stats = [0, 0, 0]  # probes, hits, reuses
+
+            def countProbes():
+                tt = getattr(agent, 'tt', None)
+                if tt is not None:
+                    stats[0] += tt.probes
+                    stats[1] += tt.hits
+                    stats[2] += tt.reuses
+            times, state = playGame(agent, getInitialState(getBenchmarkLayout(name), options.numGhosts),
+                                    'random', options.moves, countProbes)
+            probes, hits, reuses = stats
+            rows.append([name, depth, len(times), '%.1f' % (sum(times) / len(times) * 1e3),
+                         '%.1f' % (max(times) * 1e3), state.getScore(),
+                         '%.3f' % (hits / probes) if probes else '-',
+                         '%.3f' % (reuses / probes) if probes else '-'])
+    print('%s %s' % (options.agent, options.agentArgs))
+    printTable(['layout', 'depth', 'moves', 'ms/move', 'max ms', 'score', 'tt hit rate', 'reuse rate'], rows)
+
+
+class StateSet:
+    """
+    The explored tracker GameState used to have: a set of the states themselves.
+    """
+
+    def __init__(self):
+        self.states = set()
+
+    def add(self, state):
+        self.states.add(state)
+
+    def getAndReset(self):
+        states, self.states = self.states, set()
+        return states
+
+
+TRACKERS = {
+    'none': lambda: None,
+    'counter': pacman.ExploredCounter,
+    'states': StateSet,
+}
+
+BENCHMARKS = {
+    'budget': benchmarkBudget,
+    'codec': benchmarkCodec,
+    'epsilon': benchmarkEpsilon,
+    'factor': benchmarkFactor,
+    'freeze': benchmarkFreeze,
+    'grid': benchmarkGrid,
+    'joint': benchmarkJoint,
+    'memory': benchmarkMemory,
+    'model': benchmarkModel,
+    'parallel': benchmarkParallel,
+    'play': benchmarkPlay,
+    'star': benchmarkStar,
+    'stats': benchmarkStats,
+    'versus': benchmarkVersus,
+    'rules': benchmarkRules,
+    'search': benchmarkSearch,
+}
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__)
+    parser.add_option('--layouts', dest='layouts', default='originalClassic,maze-61x61,maze-121x121',
+                      help='Comma separated layouts to benchmark [Default: %default]')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='agent', default='ExpectimaxAgent',
+                      help='The search agent of multiAgents.py to benchmark [Default: %default]')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs',
+                      help='Comma separated values sent to the agent. e.g. "opt1=val1,opt2,opt3=val3"')
+    parser.add_option('--positions', type='int', dest='positions', default=10,
+                      help='Number of positions searched by the search benchmark [Default: %default]')
+    parser.add_option('--moves', type='int', dest='moves', default=100,
+                      help='Maximum number of Pacman moves of the play benchmark [Default: %default]')
+    parser.add_option('--ghostcounts', dest='ghostCounts', default='2,3,4',
+                      help='Comma separated numbers of ghosts of the factor, freeze and joint benchmarks '
+                      '[Default: %default]')
+    parser.add_option('--games', type='int', dest='games', default=5,
+                      help='Number of games per setting of the factor and versus benchmarks [Default: %default]')
+    parser.add_option('--ghosts', dest='ghosts', default='random', choices=sorted(GHOSTS),
+                      help='Ghosts of the versus benchmark, and modelled by the epsilon benchmark: ' + ', '.join(sorted(GHOSTS)) +
+                      ' [Default: %default]')
+    parser.add_option('--iterations', dest='iterations', default='100,300,1000',
+                      help='Comma separated MCTSAgent iteration budgets of the versus benchmark '
+                      '[Default: %default]')
+    parser.add_option('--budgets', dest='budgets', default='1000,10000,100000',
+                      help='Comma separated node budgets (maxNodes) of the budget benchmark [Default: %default]')
+    parser.add_option('--epsilons', dest='epsilons', default='0.001,0.01,0.05',
+                      help='Comma separated thresholds of the epsilon benchmark [Default: %default]')
+    parser.add_option('--workers', dest='workers', default='1,2,4,8',
+                      help='Comma separated worker counts of the parallel benchmark [Default: %default]')
+    parser.add_option('--tracker', dest='tracker', default='none', choices=sorted(TRACKERS),
+                      help='Explored tracker of the memory benchmark: ' + ', '.join(sorted(TRACKERS)) +
+                      ' [Default: %default]')
+    parser.add_option('--depths', dest='depths', default='2,3',
+                      help='Comma separated search depths [Default: %default]')
+    options, names = parser.parse_args(argv)
+    if len(names) == 0 or any(name not in BENCHMARKS for name in names):
+        parser.error('choose benchmarks among: ' + ', '.join(sorted(BENCHMARKS)))
+    options.layouts = options.layouts.split(',')
+    options.depths = [int(depth) for depth in options.depths.split(',')]
+    options.workers = [int(workers) for workers in options.workers.split(',')]
+    options.iterations = [int(iterations) for iterations in options.iterations.split(',')]
+    options.ghostCounts = [int(numGhosts) for numGhosts in options.ghostCounts.split(',')]
+    options.epsilons = [float(epsilon) for epsilon in options.epsilons.split(',')]
+    options.budgets = [int(maxNodes) for maxNodes in options.budgets.split(',')]
+    options.agentArgs = pacman.parseAgentArgs(options.agentArgs)
+    return options, names
+
+
+if __name__ == '__main__':
+    options, names = readCommand(sys.argv[1:])
+    for name in names:
+        print('*** %s' % name)
+        BENCHMARKS[name](options)
@@ -81,6 +81,7 @@ class Configuration:
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
     """
+    __slots__ = ('pos', 'direction')
 
     def __init__(self, pos, direction):
         self.pos = pos
@@ -129,6 +130,7 @@ class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
     """
+    __slots__ = ('start', 'configuration', 'isPacman', 'scaredTimer', 'numCarrying', 'numReturned')
 
     def __init__(self, startConfiguration: Configuration, isPacman):
         self.start = startConfiguration
@@ -243,27 +245,46 @@ class Grid:
                     list.append((x, y))
         return list
 
+    def getBits(self):
+        """
+        Returns the cells as a single int, cell (x,y) being bit x * height + y
+        (the layout of BitGrid and of __hash__).
+        """
+        return int(self._getCellDigits()[::-1], 2)
+
+    def setBits(self, bits):
+        """
+        Sets every cell from an int laid out like getBits.
+        """
+        self._setCellDigits(format(bits, 'b')[::-1].ljust(self.width * self.height, '0'))
+
+    def _getCellDigits(self):
+        """
+        The cells as a string of '0' and '1', in cell index order (x * height + y).
+        """
+        return ''.join(['1' if cell else '0' for column in self.data for cell in column])
+
+    def _setCellDigits(self, digits):
+        height = self.height
+        self.data = [[digit == '1' for digit in digits[x * height:(x + 1) * height]]
+                     for x in range(self.width)]
+
     def packBits(self):
         """
         Returns an efficient int list representation
 
         (width, height, bitPackedInts...)
         """
+        cells = self.width * self.height
+        digits = self._getCellDigits()
         bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
+        # Cell i is bit CELLS_PER_INT - 1 - i % CELLS_PER_INT of int i // CELLS_PER_INT
+        for start in range(0, cells - cells % self.CELLS_PER_INT + 1, self.CELLS_PER_INT):
+            bits.append(int(digits[start:start + self.CELLS_PER_INT].ljust(self.CELLS_PER_INT, '0'), 2))
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
-        x = index / self.height
+        x = index // self.height
         y = index % self.height
         return x, y
 
@@ -271,14 +292,12 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
-        for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height:
-                    break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
+        if any(packed < 0 for packed in bits):
+            raise ValueError("must be a positive integer")
+        cells = self.width * self.height
+        digits = ''.join([format(packed, '0%db' % self.CELLS_PER_INT) for packed in bits])[:cells]
+        # Cells past the end of the representation keep their value
+        self._setCellDigits(digits + self._getCellDigits()[len(digits):])
 
     def _unpackInt(self, packed, size):
         bools = []
@@ -294,6 +313,165 @@ class Grid:
         return bools
 
 
+class BitGrid(Grid):
+    """
+    A boolean Grid whose cells are the bits of a single Python int, cell (x,y)
+    being bit x * height + y.  Data is still accessed via grid[x][y], through a
+    lightweight GridColumn view.
+
+    Because ints are immutable, copy() is O(1), count() is a popcount and
+    asList() only visits the set bits.  Bits are laid out like the cells of
+    Grid.__hash__, so equal Grids and BitGrids hash the same.
+    """
+
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.width
+        if not 0 <= x < self.width:
+            raise IndexError('BitGrid column index out of range')
+        return GridColumn(self, x * self.height)
+
+    def __setitem__(self, x, column):
+        for y, value in enumerate(column):
+            self[x][y] = value
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield GridColumn(self, x * self.height)
+
+    def getData(self):
+        """
+        The cells as a list of columns, like Grid.data.
+        """
+        return [list(column) for column in self]
+    data = property(getData)
+
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)]
+               for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None:
+            return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def getBits(self):
+        return self.bits
+
+    def setBits(self, bits):
+        self.bits = bits
+
+    def _getCellDigits(self):
+        return format(self.bits, 'b')[::-1].ljust(self.width * self.height, '0')
+
+    def _setCellDigits(self, digits):
+        self.bits = int(digits[::-1], 2)
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return self.copy()
+
+    def count(self, item=True):
+        ones = popCount(self.bits)
+        if item:
+            return ones
+        return self.width * self.height - ones
+
+    def asList(self, key=True):
+        bits = self.bits
+        if not key:
+            bits ^= (1 << (self.width * self.height)) - 1
+        height = self.height
+        list = []
+        # Little-endian binary digits: str.find jumps from one set bit to the next
+        digits = bin(bits)[:1:-1]
+        index = digits.find('1')
+        while index >= 0:
+            list.append(divmod(index, height))
+            index = digits.find('1', index + 1)
+        return list
+
+
+class GridColumn:
+    """
+    View of one column of a BitGrid: grid[x] returns a GridColumn and
+    grid[x][y] reads or writes the bit of cell (x,y).
+    """
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, offset):
+        self.grid = grid
+        self.offset = offset
+
+    def __len__(self):
+        return self.grid.height
+
+    def _bitIndex(self, y):
+        height = self.grid.height
+        if y < 0:
+            y += height
+        if not 0 <= y < height:
+            raise IndexError('BitGrid row index out of range')
+        return self.offset + y
+
+    def __getitem__(self, y):
+        grid = self.grid
+        if 0 <= y < grid.height:
+            return (grid.bits >> (self.offset + y)) & 1 == 1
+        return (grid.bits >> self._bitIndex(y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        mask = 1 << self._bitIndex(y)
+        if value:
+            self.grid.bits |= mask
+        else:
+            self.grid.bits &= ~mask
+
+    def __iter__(self):
+        bits = self.grid.bits >> self.offset
+        for y in range(self.grid.height):
+            yield (bits >> y) & 1 == 1
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+def popCount(n):
+    """
+    Number of set bits of a non-negative int.
+    """
+    return bin(n).count('1')
+
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    popCount = int.bit_count
+
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1, 2)):
         return bitRep
@@ -395,19 +573,31 @@ class Actions:
 
 
 class GameStateData:
+    # Search trees allocate one of these per node, so no per-instance __dict__
+    __slots__ = ('food', 'foodPositions', 'capsules', 'agentStates', '_writableAgents', 'layout',
+                 '_eaten', 'score', 'zobrist', '_foodEaten', '_foodAdded', '_capsuleEaten',
+                 '_agentMoved', '_lose', '_win', 'scoreChange')
 
     def __init__(self, prevState: "GameStateData"=None):
         """
-        Generates a new data packet by copying information from its predecessor.
+        Generates a new data packet from its predecessor.
+
+        The packet shares the predecessor's food grid, capsule list and tuple of
+        agent states: the game rules copy them on write (the food grid and the
+        capsules when something is eaten, an agent state through
+        getWritableAgentState), so a move only copies what it changes.
         """
         if prevState != None:
             from layout import Layout
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates: List[AgentState] = self.copyAgentStates(prevState.agentStates)
+            self.food = prevState.food
+            self.foodPositions = prevState.foodPositions
+            self.capsules = prevState.capsules
+            self.agentStates: Tuple[AgentState, ...] = prevState.agentStates
+            self._writableAgents = 0  # Bit i is set once agentStates[i] is our own copy
             self.layout: Layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.zobrist = prevState.zobrist
 
         self._foodEaten = None
         self._foodAdded = None
@@ -420,6 +610,9 @@ class GameStateData:
     def deepCopy(self):
         state = GameStateData(self)
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = tuple(self.copyAgentStates(self.agentStates))
+        state._writableAgents = (1 << len(state.agentStates)) - 1
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -433,6 +626,19 @@ class GameStateData:
             copiedStates.append(agentState.copy())
         return copiedStates
 
+    def getWritableAgentState(self, index):
+        """
+        Returns agentStates[index], first replacing it by a private copy if it
+        is still shared with the predecessor.  The game rules call this before
+        editing an agent state.
+        """
+        if not self._writableAgents >> index & 1:
+            agentStates = list(self.agentStates)
+            agentStates[index] = agentStates[index].copy()
+            self.agentStates = tuple(agentStates)
+            self._writableAgents |= 1 << index
+        return self.agentStates[index]
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -454,13 +660,21 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate(self.agentStates):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                # hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113 * hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575)
+        return self.getKey()
+
+    def getKey(self):
+        """
+        Returns a 64-bit Zobrist key of the state (agents, food, capsules and
+        score).  Equal states have equal keys, so the key can be used directly
+        as a transposition-table key.
+
+        The score-free part, self.zobrist, is computed once in initialize and
+        then updated incrementally by the game rules (see layout.ZobristTable).
+        """
+        table = self.layout.getZobristTable()
+        if self.zobrist is None:
+            self.zobrist = table.stateKey(self)
+        return self.zobrist ^ table.scoreKey(self.score)
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
@@ -521,13 +735,17 @@ class GameStateData:
         Creates an initial game state from a layout array (see layout.py).
         """
         self.food = layout.food.copy()
+        # Positions of the remaining food, in food.asList() order.  Kept in sync
+        # with self.food by the game rules, so counting or listing the food
+        # does not need to scan the grid.
+        self.foodPositions = tuple(self.food.asList())
         #self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
 
-        self.agentStates = []
+        agentStates = []
         numGhosts = 0
         for isPacman, pos in layout.agentPositions:
             if not isPacman:
@@ -535,9 +753,12 @@ class GameStateData:
                     continue  # Max ghosts reached already
                 else:
                     numGhosts += 1
-            self.agentStates.append(AgentState(
+            agentStates.append(AgentState(
                 Configuration(pos, Directions.STOP), isPacman))
+        self.agentStates = tuple(agentStates)
+        self._writableAgents = (1 << len(agentStates)) - 1
         self._eaten = [False for a in self.agentStates]
+        self.zobrist = layout.getZobristTable().stateKey(self)
 
 
 try:
@@ -574,6 +795,25 @@ class Game:
         else:
             return self.rules.getProgress(self)
 
+    def getMoveTimeLeft(self, agentIndex, moveTime=0):
+        """
+        Returns the number of seconds the agent may still spend on its current
+        move (moveTime already spent) without timing out or getting a warning.
+        Only the per-move limits count here; see getTotalTimeLeft.
+        """
+        timeLeft = min(self.rules.getMoveTimeout(agentIndex),
+                       self.rules.getMoveWarningTime(agentIndex)) - moveTime
+        return max(0, timeLeft)
+
+    def getTotalTimeLeft(self, agentIndex, moveTime=0):
+        """
+        Returns the number of seconds left to the agent for the rest of the
+        game (moveTime already spent on its current move).  This is a budget
+        for all its remaining moves, not for one.
+        """
+        totalTimeLeft = self.rules.getMaxTotalTime(agentIndex) - self.totalAgentTimes[agentIndex]
+        return max(0, totalTimeLeft - moveTime)
+
     def _agentCrash(self, agentIndex, quiet=False):
         "Helper method for handling agent crashes"
         if not quiet:
@@ -682,6 +922,11 @@ class Game:
             else:
                 observation = self.state.deepCopy()
 
+            # Tell agents that budget their time how much they have
+            if 'setMoveTimeout' in dir(agent):
+                agent.setMoveTimeout(self.getMoveTimeLeft(agentIndex, move_time),
+                                     self.getTotalTimeLeft(agentIndex, move_time))
+
             # Solicit an action
             action = None
             self.mute(agentIndex)
@@ -734,6 +979,19 @@ class Game:
                 action = agent.getAction(observation)
             self.unmute()
 
+            # Let agents that record search statistics publish those of this move
+            if 'flushStats' in dir(agent):
+                try:
+                    self.mute(agentIndex)
+                    agent.flushStats()
+                    self.unmute()
+                except Exception as data:
+                    if not self.catchExceptions:
+                        raise
+                    self._agentCrash(agentIndex)
+                    self.unmute()
+                    return
+
             # Execute the action
             self.moveHistory.append((agentIndex, action))
             if self.catchExceptions:
@@ -61,7 +61,10 @@ class DirectionalGhost(GhostAgent):
         legalActions = state.getLegalActions(self.index)
         pos = state.getGhostPosition(self.index)
         isScared = ghostState.scaredTimer > 0
+        return self.getActionDistribution(legalActions, pos, state.getPacmanPosition(), isScared)
 
+    def getActionDistribution(self, legalActions, pos, pacmanPosition, isScared):
+        "The distribution of getDistribution, from the variables it reads in the state."
         speed = 1
         if isScared:
             speed = 0.5
@@ -69,7 +72,6 @@ class DirectionalGhost(GhostAgent):
         actionVectors = [Actions.directionToVector(
             a, speed) for a in legalActions]
         newPositions = [(pos[0]+a[0], pos[1]+a[1]) for a in actionVectors]
-        pacmanPosition = state.getPacmanPosition()
 
         # Select best actions given the state
         distancesToPacman = [manhattanDistance(
@@ -91,3 +93,31 @@ class DirectionalGhost(GhostAgent):
             dist[a] += (1-bestProb) / len(legalActions)
         dist.normalize()
         return dist
+
+
+class DistributionTable:
+    """
+    Caches the distributions of a ghost model (e.g. a DirectionalGhost) for
+    use inside a search.  The distribution of a ghost only depends on its
+    cell, its heading (which gives its legal actions), Pacman's cell and
+    whether it is scared, so it is computed once per such key.  A table is
+    only valid for the walls of one layout.
+    """
+
+    def __init__(self, ghost):
+        self.ghost = ghost
+        self.distributions = {}
+
+    def getDistribution(self, state, index):
+        "Returns the probabilities of the legal actions of ghost index, in the order of getLegalActions."
+        ghostState = state.getGhostState(index)
+        configuration = ghostState.configuration
+        pacmanPosition = state.getPacmanPosition()
+        isScared = ghostState.scaredTimer > 0
+        key = (configuration.pos, configuration.direction, pacmanPosition, isScared)
+        probabilities = self.distributions.get(key)
+        if probabilities is None:
+            legalActions = state.getLegalActions(index)
+            dist = self.ghost.getActionDistribution(legalActions, configuration.pos, pacmanPosition, isScared)
+            probabilities = self.distributions[key] = [dist[a] for a in legalActions]
+        return probabilities
@@ -14,34 +14,87 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
+from game import Actions
+from game import Configuration
+from game import Directions
+import hashlib
 import os
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+ZOBRIST_TABLE_CACHE = {}
+MOVE_TABLE_CACHE = {}
+LAYOUT_REGISTRY = {}
 
 
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    With bitboards, walls and food are stored in BitGrids instead of Grids
+    (and so is the food of every game state played on the layout).
     """
 
-    def __init__(self, layoutText):
+    def __init__(self, layoutText, bitboards=False):
         self.width = len(layoutText[0])
         self.height = len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.bitboards = bitboards
+        gridClass = BitGrid if bitboards else Grid
+        self.walls = gridClass(self.width, self.height, False)
+        self.food = gridClass(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.zobristTable = None
+        self.moveTable = None
+        self.layoutId = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getZobristTable(self):
+        """
+        Returns the ZobristTable used to hash game states on this layout.  Tables
+        only depend on the layout text, so copies of a layout share them.
+        """
+        if self.zobristTable is None:
+            key = '\n'.join(self.layoutText)
+            if key not in ZOBRIST_TABLE_CACHE:
+                ZOBRIST_TABLE_CACHE[key] = ZobristTable(self, key)
+            self.zobristTable = ZOBRIST_TABLE_CACHE[key]
+        return self.zobristTable
+
+    def getLayoutId(self):
+        """
+        Returns a 64-bit id of the layout, computed from its text (and whether
+        it uses bitboards), so it is the same in every process.  Encoded game
+        states (GameState.encode) refer to their layout by this id.  The layout
+        is registered under its id (see registerLayout).
+        """
+        if self.layoutId is None:
+            key = '\n'.join(self.layoutText) + ('\nbitboards' if self.bitboards else '')
+            self.layoutId = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+            LAYOUT_REGISTRY.setdefault(self.layoutId, self)
+        return self.layoutId
+
+    def getMoveTable(self):
+        """
+        Returns the MoveTable of this layout's walls, shared like the
+        ZobristTable by every layout with the same text.
+        """
+        if self.moveTable is None:
+            key = '\n'.join(self.layoutText)
+            if key not in MOVE_TABLE_CACHE:
+                MOVE_TABLE_CACHE[key] = MoveTable(self)
+            self.moveTable = MOVE_TABLE_CACHE[key]
+        return self.moveTable
+
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
         if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
@@ -97,7 +150,20 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        layout = Layout(self.layoutText[:], self.bitboards)
+        layout.layoutId = self.layoutId
+        return layout
+
+    def __getstate__(self):
+        """
+        The Zobrist and move tables are left out of pickles (they would make
+        every pickled game state dozens of times larger): both are rebuilt
+        from the layout text, with the same keys, on first use.
+        """
+        state = self.__dict__.copy()
+        state['zobristTable'] = None
+        state['moveTable'] = None
+        return state
 
     def processLayoutText(self, layoutText):
         """
@@ -137,28 +203,189 @@ class Layout:
             self.numGhosts += 1
 
 
-def getLayout(name, back=2):
+class ZobristTable:
+    """
+    Random 64-bit keys for every (agent, position), (agent, direction),
+    (agent, scared timer), food cell and capsule cell of a layout.  A game
+    state's key is the XOR of the keys of its features, so a move only has
+    to XOR out the old features and XOR in the new ones.
+
+    Agents may stand half-way between cells (scared ghosts move at half
+    speed), so positions are indexed on a grid twice as fine as the layout.
+    """
+    MASK = (1 << 64) - 1
+    SCORE_MULTIPLIER = 0x9E3779B97F4A7C15
+    TIMER_SLOTS = 64
+
+    def __init__(self, layout, seed):
+        from game import Directions
+        # Seeded from the layout text: keys are identical across runs and processes
+        rng = random.Random(seed)
+        numAgents = max(1, len(layout.agentPositions))
+        numCells = layout.width * layout.height
+        self.height = layout.height
+        self.halfHeight = 2 * layout.height
+        self.positions = [[rng.getrandbits(64) for i in range(4 * numCells)]
+                          for agent in range(numAgents)]
+        self.directions = [dict((direction, rng.getrandbits(64)) for direction in
+                                [Directions.NORTH, Directions.SOUTH, Directions.EAST,
+                                 Directions.WEST, Directions.STOP])
+                           for agent in range(numAgents)]
+        self.timers = [[rng.getrandbits(64) for i in range(self.TIMER_SLOTS)]
+                       for agent in range(numAgents)]
+        self.food = [rng.getrandbits(64) for i in range(numCells)]
+        self.capsules = [rng.getrandbits(64) for i in range(numCells)]
+
+    def agentKey(self, index, agentState):
+        """
+        Key of an agent's position, direction and scared timer.
+        """
+        configuration = agentState.configuration
+        if configuration is None:
+            return 0
+        x, y = configuration.pos
+        return (self.positions[index][int(2 * x) * self.halfHeight + int(2 * y)] ^
+                self.directions[index][configuration.direction] ^
+                self.timers[index][agentState.scaredTimer % self.TIMER_SLOTS])
+
+    def foodKey(self, x, y):
+        return self.food[x * self.height + y]
+
+    def capsuleKey(self, position):
+        x, y = position
+        return self.capsules[x * self.height + y]
+
+    def scoreKey(self, score):
+        # Not hash(score): hash(-1) == hash(-2)
+        return (int(score) * self.SCORE_MULTIPLIER) & self.MASK
+
+    def stateKey(self, data):
+        """
+        Computes from scratch the key of a GameStateData, without its score.
+        """
+        key = 0
+        for index, agentState in enumerate(data.agentStates):
+            key ^= self.agentKey(index, agentState)
+        for x, y in data.food.asList():
+            key ^= self.foodKey(x, y)
+        for position in data.capsules:
+            key ^= self.capsuleKey(position)
+        return key
+
+
+class MoveTable:
+    """
+    The legal actions and successor cells of every free cell of a layout, so
+    the game rules do not probe the walls on every move:
+
+      pacmanActions[(x, y)]            actions of Actions.getPossibleActions
+      ghostActions[(x, y)][direction]  actions of a ghost heading in direction
+                                       (no STOP, no reverse but in dead ends)
+      nextCells[(x, y)][action]        cell reached by a move of speed 1
+
+    Only integer positions are in the tables: agents between two cells
+    (scared ghosts move at half speed) are left to Actions.
+    """
+
+    def __init__(self, layout):
+        walls = layout.walls
+        self.pacmanActions = {}
+        self.ghostActions = {}
+        self.nextCells = {}
+        for x in range(layout.width):
+            for y in range(layout.height):
+                if walls[x][y]:
+                    continue
+                try:
+                    possible = Actions.getPossibleActions(
+                        Configuration((x, y), Directions.STOP), walls)
+                except IndexError:
+                    continue  # Open border: Actions raises as it always did
+                self.pacmanActions[(x, y)] = tuple(possible)
+                self.nextCells[(x, y)] = dict(
+                    (action, (x + Actions._directions[action][0], y + Actions._directions[action][1]))
+                    for action in possible)
+                ghostActions = {}
+                for direction in Actions._directions:
+                    actions = [action for action in possible if action != Directions.STOP]
+                    reverse = Actions.reverseDirection(direction)
+                    if reverse in actions and len(actions) > 1:
+                        actions.remove(reverse)
+                    ghostActions[direction] = tuple(actions)
+                self.ghostActions[(x, y)] = ghostActions
+
+    def getDistances(self, source):
+        """
+        Returns the maze distance from the cell source to every free cell
+        reachable from it (a breadth-first search of the move table).
+        """
+        distances = {source: 0}
+        frontier = [source]
+        distance = 0
+        while frontier:
+            distance += 1
+            nextFrontier = []
+            for cell in frontier:
+                for nextCell in self.nextCells[cell].values():
+                    if nextCell not in distances:
+                        distances[nextCell] = distance
+                        nextFrontier.append(nextCell)
+            frontier = nextFrontier
+        return distances
+
+    def getNextConfigurations(self, configuration, actions, speed):
+        """
+        Returns the configurations reached from configuration by each of the
+        (legal) actions at the given speed, looking the cell up only once.
+        """
+        nextCells = self.nextCells.get(configuration.pos) if speed == 1 else None
+        if nextCells is None:
+            return [configuration.getNextState(Actions.directionToVector(action, speed))
+                    for action in actions]
+        direction = configuration.direction
+        return [Configuration(nextCells[action], direction if action == Directions.STOP else action)
+                for action in actions]
+
+
+def registerLayout(layout):
+    """
+    Makes the layout known to getRegisteredLayout in this process, e.g. before
+    decoding game states encoded in another one.  Returns its id.
+    """
+    return layout.getLayoutId()
+
+
+def getRegisteredLayout(layoutId):
+    """
+    Returns the layout registered under layoutId (see Layout.getLayoutId).
+    """
+    if layoutId not in LAYOUT_REGISTRY:
+        raise Exception('Unknown layout id %#x: register the layout first (registerLayout)' % layoutId)
+    return LAYOUT_REGISTRY[layoutId]
+
+
+def getLayout(name, back=2, bitboards=False):
     if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
+        layout = tryToLoad('layouts/' + name, bitboards)
         if layout == None:
-            layout = tryToLoad(name)
+            layout = tryToLoad(name, bitboards)
     else:
-        layout = tryToLoad('layouts/' + name + '.lay')
+        layout = tryToLoad('layouts/' + name + '.lay', bitboards)
         if layout == None:
-            layout = tryToLoad(name + '.lay')
+            layout = tryToLoad(name + '.lay', bitboards)
     if layout == None and back >= 0:
         curdir = os.path.abspath('.')
         os.chdir('..')
-        layout = getLayout(name, back - 1)
+        layout = getLayout(name, back - 1, bitboards)
         os.chdir(curdir)
     return layout
 
 
-def tryToLoad(fullname):
+def tryToLoad(fullname, bitboards=False):
     if(not os.path.exists(fullname)):
         return None
     f = open(fullname)
     try:
-        return Layout([line.strip() for line in f])
+        return Layout([line.strip() for line in f], bitboards)
     finally:
         f.close()
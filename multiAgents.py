@@ -14,13 +14,164 @@
 
 from util import manhattanDistance
 from game import Directions
-from pacman import GameState
+from pacman import GameState, COLLISION_TOLERANCE
 import util
 
 from game import Agent
+from collections import OrderedDict
+import concurrent.futures
+import functools
+import json
+import multiprocessing
+import ghostAgents
+import layout
+import pickle
+import random
+import copy
+import math
+import time
 
 PACMAN = 0
 
+# Type de valeur stockée dans une table de transposition
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Modèles des fantomes (option ghostModel de ExpectimaxAgent et MCTSAgent)
+GHOST_MODELS = {'random': ghostAgents.RandomGhost, 'directional': ghostAgents.DirectionalGhost}
+
+def argToBool(value):
+    """
+    Convertit un argument d'agent en booléen. Les options passées par -a arrivent sous
+    forme de chaînes ('True', '0', ...) ou valent 1 lorsqu'aucune valeur n'est donnée.
+    """
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+class SearchTimeout(Exception):
+    """
+    Levée pendant une recherche lorsque l'échéance du coup est dépassée, ou son budget de
+    noeuds (maxNodes) épuisé.
+    """
+    pass
+
+class SearchStats:
+    """
+    Statistiques de la recherche d'un coup (voir MultiAgentSearchAgent.enableStats) :
+      move           : numéro du coup de l'agent (depuis 1)
+      nodesPerDepth  : noeuds (appels à maximise et minimise) par tour depuis la racine
+      evaluations    : appels à la fonction d'évaluation
+      cutoffs        : coupures alpha-beta, None si l'agent n'en fait pas
+      ttProbes/ttHits: consultations et succès de la table de transposition, None sans table
+      maxDepth       : profondeur atteinte (depthReached)
+      time           : durée de getAction, en secondes
+      generationTime : part de cette durée passée à générer les états fils
+      generated      : états fils générés
+    """
+
+    def __init__(self, str_agent, i_move):
+        self.agent = str_agent
+        self.move = i_move
+        self.nodesPerDepth = []
+        self.evaluations = 0
+        self.cutoffs = None
+        self.ttProbes, self.ttHits = None, None
+        self.maxDepth = 0
+        self.time, self.generationTime = 0.0, 0.0
+        self.generated = 0
+
+    def asDict(self):
+        return dict(self.__dict__)
+
+class JsonLinesStatsSink:
+    """
+    Destination des statistiques (voir MultiAgentSearchAgent.addStatsSink) : une ligne JSON
+    par coup, ajoutée au fichier str_path. Le fichier est ouvert au premier coup et fermé
+    en fin de partie (close).
+    """
+
+    def __init__(self, str_path):
+        self.path = str_path
+        self.file = None
+
+    def __call__(self, t_stats: SearchStats):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps(t_stats.asDict()) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# Pools de processus persistants, par nombre de processus : (pool, alpha partagé)
+PROCESS_POOLS = {}
+# Dans un processus du pool : alpha partagé, dernière recherche reçue
+WORKER_STATE = {}
+
+def getProcessPool(i_workers):
+    """
+    Retourne le pool persistant de i_workers processus et la valeur alpha (multiprocessing.Value)
+    qu'ils partagent. Le pool est créé au premier appel puis réutilisé d'un coup à l'autre.
+    """
+    if i_workers not in PROCESS_POOLS:
+        # une Value se transmet aux processus à leur création (initializer), pas avec les tâches
+        v_alpha = multiprocessing.Value('d', float('-inf'))
+        t_pool = concurrent.futures.ProcessPoolExecutor(i_workers, initializer=initWorker, initargs=(v_alpha,))
+        PROCESS_POOLS[i_workers] = (t_pool, v_alpha)
+    return PROCESS_POOLS[i_workers]
+
+def initWorker(v_alpha):
+    WORKER_STATE['alpha'] = v_alpha
+
+def packSearch(t_agent, t_state: GameState):
+    """
+    Sérialise une recherche (agent et état racine) pour les processus du pool. L'état est
+    encodé par GameState.encode ; le texte du layout est envoyé avec, et chaque processus
+    construit (et enregistre) une seule fois chaque layout.
+    """
+    t_layout = t_state.data.layout
+    return pickle.dumps((t_agent, t_state.encode(), t_layout.getLayoutId(), tuple(t_layout.layoutText),
+                         t_layout.bitboards), pickle.HIGHEST_PROTOCOL)
+
+def unpackSearch(b_payload):
+    """
+    Désérialise (agent, état racine) dans un processus du pool ; les tâches d'une même
+    recherche reçoivent la même charge, désérialisée une seule fois.
+    """
+    if WORKER_STATE.get('payload') != b_payload:
+        t_agent, b_state, i_layout_id, t_layout_text, b_bitboards = pickle.loads(b_payload)
+        if i_layout_id not in layout.LAYOUT_REGISTRY:
+            layout.registerLayout(layout.Layout(list(t_layout_text), b_bitboards))
+        WORKER_STATE['payload'], WORKER_STATE['search'] = b_payload, (t_agent, GameState.decode(b_state))
+    return WORKER_STATE['search']
+
+def searchRootTask(b_payload, str_action, str_ghost_action, f_time_left):
+    """
+    Tâche exécutée par un processus du pool : valeur de l'action str_action de Pacman à la
+    racine (suivie de l'action str_ghost_action du premier fantome si elle est donnée).
+    Avec shareAlpha, la recherche part de l'alpha partagé courant et le relit en cours de
+    route (voir rootAlpha). Retourne (valeur, noeuds explorés).
+    """
+    t_agent, t_state = unpackSearch(b_payload)
+    t_agent.nodes = 0
+    f_alpha = float('-inf')
+    if t_agent.shareAlpha:
+        t_agent.rootAlpha = WORKER_STATE['alpha']
+        f_alpha = t_agent.rootAlpha.value
+    if f_time_left is not None:
+        t_agent.deadline = time.perf_counter() + f_time_left
+    try:
+        t_child = t_state.getNextState(PACMAN, str_action, validate=False)
+        i_agent_index = PACMAN + 1
+        if str_ghost_action is not None:
+            t_child = t_child.getNextState(i_agent_index, str_ghost_action, validate=False)
+            i_agent_index += 1
+        f_value = t_agent.searchFrom(t_agent.searchDepth, t_agent.getSearchState(t_child), i_agent_index, f_alpha)
+    finally:
+        t_agent.deadline = None
+        t_agent.rootAlpha = None
+    return f_value, t_agent.nodes
+
 def scoreEvaluationFunction(currentGameState: GameState):
     """
     This default evaluation function just returns the score of the state.
@@ -31,6 +182,42 @@ def scoreEvaluationFunction(currentGameState: GameState):
     """
     return currentGameState.getScore()
 
+def scoreEvaluationBounds(state: GameState, i_depth):
+    """
+    Bornes (basse, haute) de scoreEvaluationFunction sur les états atteints depuis state en
+    au plus i_depth tours complets : au pire -1 par coup de Pacman, et -500 s'il perd (si un
+    fantome peut l'atteindre) ; au mieux +10 par nourriture mangée (une par coup), +500 s'il
+    gagne (s'il peut manger toute la nourriture) et +200 par fantome mangé (au plus un par
+    fantome et par tour, s'il y a un fantome effrayé ou une capsule à portée).
+    """
+    i_score = state.getScore()
+    i_food = state.getNumFood()
+    t_pacman_position = state.getPacmanPosition()
+    f_low = i_score - i_depth
+    # Pacman et un fantome se rapprochent au plus de 2 cases par tour
+    if any(manhattanDistance(t_pacman_position, t_position) <= 2 * i_depth + 1
+           for t_position in state.getGhostPositions()):
+        f_low -= 500
+    f_high = i_score + 10 * min(i_depth, i_food)
+    if i_food <= i_depth:
+        f_high += 500
+    if (any(t_ghost.scaredTimer > 0 for t_ghost in state.getGhostStates())
+            or any(manhattanDistance(t_pacman_position, t_capsule) <= i_depth for t_capsule in state.getCapsules())):
+        f_high += 200 * (state.getNumAgents() - 1) * i_depth
+    return f_low, f_high
+
+def scoreEvaluationGhostTerm(state: GameState, i_agent_index):
+    """
+    Part du fantome i_agent_index dans scoreEvaluationFunction : aucune, le score ne change
+    pas quand un fantome bouge sans toucher Pacman.
+    """
+    return 0
+
+# Bornes utilisées par ExpectimaxAgent en mode star (voir ExpectimaxAgent.getEvaluationBounds)
+scoreEvaluationFunction.bounds = scoreEvaluationBounds
+# Terme de chaque fantome, utilisé par ExpectimaxAgent en mode factorGhosts (voir factoredExpectation)
+scoreEvaluationFunction.ghostTerm = scoreEvaluationGhostTerm
+
 class MultiAgentSearchAgent(Agent):
     """
     This class provides some common elements to all of your
@@ -45,11 +232,518 @@ class MultiAgentSearchAgent(Agent):
     only partially specified, and designed to be extended.  Agent (game.py)
     is another abstract class.
     """
+    # Génère-t-on tous les fils d'un noeud d'un coup (getSuccessors) par défaut ?
+    BATCH = True
+    # Part du temps restant pour le coup (donné par le jeu, voir setMoveTimeout) que la
+    # recherche s'accorde
+    TIMEOUT_FRACTION = 0.5
+    # Part du temps restant pour toute la partie : il doit suffire aux centaines de coups
+    # qui restent à jouer, chacun n'en prend donc qu'une petite part
+    TOTAL_TIME_FRACTION = 0.02
+    # Part du temps de la partie (au premier coup) gardée en réserve : le temps restant
+    # décroît géométriquement vers cette réserve, qui paie les coups joués à la profondeur 1
+    # (toujours terminée) quand la partie dure plus longtemps que prévu
+    TOTAL_TIME_RESERVE = 0.25
+    # Temps par coup et par partie des règles par défaut (ClassicGameRules), si le jeu ne
+    # les a pas donnés
+    DEFAULT_MOVE_TIMEOUT = 30
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', inPlace = 'False', batch = None,
+                 timeLimit = None, maxDepth = '64', workers = '1', freezeGhosts = 'False', freezeMargin = '0',
+                 jointGhosts = 'False', maxNodes = None, stats = 'False', statsFile = None, shareAlpha = 'True'):
         self.index = 0 # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        self.inPlace = argToBool(inPlace)
+        self.batch = self.BATCH if batch is None else argToBool(batch)
+        # timeLimit : secondes par coup, ou 'rules' pour se régler sur le temps laissé par le jeu
+        if timeLimit is None or timeLimit == 'rules':
+            self.timeLimit = timeLimit
+        else:
+            self.timeLimit = float(timeLimit)
+        self.maxDepth = int(maxDepth)
+        self.moveTimeout, self.totalTimeout = None, None
+        self.totalTimeReserve = None
+        self.deadline = None
+        self.depthReached = 0
+        self.searchDepth = self.depth   # profondeur de la recherche en cours, depuis la racine
+        # workers > 1 : la racine est répartie sur un pool de processus (voir searchRootInParallel)
+        self.workers = int(workers)
+        # shareAlpha : les processus s'échangent le meilleur score obtenu à la racine (l'alpha
+        # partagé) ; rootAlpha est cette multiprocessing.Value, dans un processus du pool
+        # seulement (None sinon)
+        self.shareAlpha = argToBool(shareAlpha)
+        self.rootAlpha = None
+        self.nodes = 0
+        # freezeGhosts : un fantome trop loin pour atteindre Pacman avant l'horizon (à
+        # freezeMargin cases près) ne joue plus que sa première action légale (getGhostActions)
+        self.freezeGhosts = argToBool(freezeGhosts)
+        self.freezeMargin = int(freezeMargin)
+        # distances depuis la case de Pacman à la racine, et (labyrinthe, case) pour lesquels
+        # elles valent
+        self.rootDistances, self.rootCell = None, None
+        # ce dont dépendent les fantomes figés : (case de Pacman à la racine, profondeur de la
+        # recherche) ; None sans freezeGhosts. Fait partie des clés de la table de transposition.
+        self.freezeContext = None
+        # jointGhosts : le tour de tous les fantomes forme un seul niveau (voir getJointOutcomes)
+        self.jointGhosts = argToBool(jointGhosts)
+        self.jointOutcomes, self.jointMerged = 0, 0    # cumulés depuis la création de l'agent
+        # maxNodes : budget par coup, en états fils générés ; la recherche par approfondissement
+        # itératif s'arrête à la dernière profondeur terminée dans le budget (voir searchAction)
+        self.maxNodes = None if maxNodes is None else int(maxNodes)
+        if self.maxNodes is not None and self.workers > 1:
+            raise Exception('A node budget needs workers=1')
+        self.nodeLimit = None   # budget de la profondeur en cours, None : illimité
+        # derniers coups : états fils générés et durée de la recherche (en secondes)
+        self.generated, self.searchTime = 0, 0.0
+        # stats / statsFile : statistiques de chaque coup (voir enableStats), écrites en JSON
+        # dans statsFile ; self.stats vaut None tant qu'elles ne sont pas activées
+        self.stats, self.statsSinks, self.statsFlushed = None, [], 0
+        if argToBool(stats) or statsFile is not None:
+            self.enableStats()
+        if statsFile is not None:
+            self.addStatsSink(JsonLinesStatsSink(statsFile))
+
+    def enableStats(self):
+        """
+        Active les statistiques : chaque getAction remplit un nouvel objet SearchStats
+        (self.stats). Les compteurs sont des enveloppes posées sur l'instance autour de
+        getAction, maximise, minimise, getChildren, getJointOutcomes et de la fonction
+        d'évaluation : les méthodes de la classe ne changent pas, et une recherche sans
+        statistiques ne paie rien. Les enveloppes ne passent pas aux processus du pool.
+        """
+        if self.workers > 1:
+            raise Exception('Search statistics need workers=1')
+        if self.stats is not None:
+            return
+        self.stats = SearchStats(type(self).__name__, 0)    # avant le premier coup
+
+        def wrap(str_name, f_wrapper):
+            setattr(self, str_name, functools.wraps(getattr(self, str_name))(f_wrapper))
+
+        f_get_action = self.getAction
+        def getAction(state):
+            self.stats = t_stats = SearchStats(type(self).__name__, self.stats.move + 1)
+            f_start = time.perf_counter()
+            try:
+                return f_get_action(state)
+            finally:
+                t_stats.time = time.perf_counter() - f_start
+                t_stats.maxDepth = self.depthReached
+                t_stats.generated = self.generated
+                t_stats.cutoffs = getattr(self, 'cutoffs', None)
+                t_tt = getattr(self, 'tt', None)
+                if t_tt is not None:
+                    t_stats.ttProbes, t_stats.ttHits = t_tt.probes, t_tt.hits
+        wrap('getAction', getAction)
+
+        f_evaluation = self.evaluationFunction
+        def evaluationFunction(*args):
+            self.stats.evaluations += 1
+            return f_evaluation(*args)
+        wrap('evaluationFunction', evaluationFunction)
+
+        def countNode(str_name):
+            f_method = getattr(self, str_name, None)
+            if f_method is None:
+                return
+            def countedNode(i_depth, *args):
+                l_nodes = self.stats.nodesPerDepth
+                i_ply = self.searchDepth - i_depth
+                while len(l_nodes) <= i_ply:
+                    l_nodes.append(0)
+                l_nodes[i_ply] += 1
+                return f_method(i_depth, *args)
+            wrap(str_name, countedNode)
+        countNode('maximise')
+        countNode('minimise')
+
+        f_get_children = self.getChildren
+        def getChildren(*args):
+            t_children = f_get_children(*args)
+            try:
+                while True:
+                    f_start = time.perf_counter()
+                    try:
+                        t_child = next(t_children)
+                    except StopIteration:
+                        return
+                    finally:
+                        self.stats.generationTime += time.perf_counter() - f_start
+                    yield t_child
+            finally:
+                t_children.close()  # restaure l'état (undoMove) si l'appelant quitte sa boucle
+        wrap('getChildren', getChildren)
+
+        f_get_joint_outcomes = self.getJointOutcomes
+        def getJointOutcomes(*args):
+            f_start = time.perf_counter()
+            try:
+                return f_get_joint_outcomes(*args)
+            finally:
+                self.stats.generationTime += time.perf_counter() - f_start
+        wrap('getJointOutcomes', getJointOutcomes)
+
+    def addStatsSink(self, f_sink):
+        """
+        Ajoute une destination aux statistiques (et les active) : f_sink(stats) est appelée
+        par flushStats après chaque coup, par exemple une fonction ou un JsonLinesStatsSink.
+        """
+        self.enableStats()
+        self.statsSinks.append(f_sink)
+
+    def flushStats(self):
+        """
+        Appelée par le jeu (Game.run) après chaque coup : envoie les statistiques du coup
+        aux destinations (addStatsSink).
+        """
+        if self.stats is None or self.stats.move == self.statsFlushed:
+            return
+        self.statsFlushed = self.stats.move    # un coup n'est envoyé qu'une fois
+        for f_sink in self.statsSinks:
+            f_sink(self.stats)
+
+    def final(self, state: GameState):
+        """
+        Appelée par le jeu en fin de partie : ferme les destinations qui le demandent.
+        """
+        for f_sink in self.statsSinks:
+            if hasattr(f_sink, 'close'):
+                f_sink.close()
+
+    def registerInitialState(self, state: GameState):
+        """
+        Appelée par le jeu au début de chaque partie : la réserve de temps sera fixée au
+        premier coup, et les distances de freezeGhosts recalculées (le labyrinthe peut changer).
+        """
+        self.totalTimeReserve = None
+        self.rootDistances, self.rootCell = None, None
+
+    def setMoveTimeout(self, f_seconds, f_total_seconds=None):
+        """
+        Appelée par le jeu (Game.run) avant chaque coup : temps restant pour ce coup, et
+        temps restant pour toute la partie (tous les coups qui restent).
+        """
+        self.moveTimeout, self.totalTimeout = f_seconds, f_total_seconds
+        if self.totalTimeReserve is None and f_total_seconds is not None:
+            self.totalTimeReserve = self.TOTAL_TIME_RESERVE * f_total_seconds
+
+    def getTimeBudget(self):
+        """
+        Temps (en secondes) accordé à la recherche du coup, None si la profondeur est fixe :
+        au plus TIMEOUT_FRACTION du temps restant pour le coup et TOTAL_TIME_FRACTION du
+        temps restant pour la partie au-delà de la réserve, et au plus timeLimit s'il est
+        donné en secondes.
+        """
+        if self.timeLimit is None:
+            return None
+        f_move_timeout, f_total_timeout = self.moveTimeout, self.totalTimeout
+        if f_move_timeout is None and self.timeLimit == 'rules':
+            f_move_timeout = f_total_timeout = self.DEFAULT_MOVE_TIMEOUT
+        if f_move_timeout is None:
+            return self.timeLimit
+        f_budget = self.TIMEOUT_FRACTION * f_move_timeout
+        if f_total_timeout is not None:
+            f_spendable = f_total_timeout - (self.totalTimeReserve or 0)
+            f_budget = min(f_budget, self.TOTAL_TIME_FRACTION * max(0, f_spendable))
+        if self.timeLimit == 'rules':
+            return f_budget
+        return min(self.timeLimit, f_budget)
+
+    def searchAction(self, state: GameState):
+        """
+        Retourne l'action choisie par self.maximise, à la profondeur self.depth ou, si un
+        temps (timeLimit) ou un budget de noeuds (maxNodes) est donné, par approfondissement
+        itératif : profondeur 1, 2, 3, ... jusqu'à maxDepth, l'échéance ou l'épuisement du
+        budget. Une itération interrompue (SearchTimeout) est abandonnée : on garde l'action
+        de la dernière itération terminée. La profondeur atteinte est gardée dans
+        self.depthReached, les états fils générés dans self.generated et la durée dans
+        self.searchTime. Le budget de noeuds, contrairement au temps, donne le même coup
+        quelle que soit la charge de la machine.
+        """
+        f_start = time.perf_counter()
+        self.generated = 0
+        try:
+            f_budget = self.getTimeBudget()
+            if f_budget is None and self.maxNodes is None:
+                self.depthReached = self.depth
+                return self.searchRoot(self.depth, state)[1]  # maximise/minimise retourne (valeur, action)
+
+            f_deadline = None if f_budget is None else f_start + f_budget
+            str_best_move, self.depthReached = None, 0
+            for i_depth in range(1, self.maxDepth + 1):
+                # la profondeur 1 est toujours terminée, pour avoir une action à jouer
+                if i_depth > 1:
+                    self.deadline, self.nodeLimit = f_deadline, self.maxNodes
+                try:
+                    str_best_move = self.searchRoot(i_depth, state)[1]
+                except SearchTimeout:
+                    break
+                finally:
+                    self.deadline, self.nodeLimit = None, None
+                self.depthReached = i_depth
+                if f_deadline is not None and time.perf_counter() >= f_deadline:
+                    break
+                if self.maxNodes is not None and self.generated >= self.maxNodes:
+                    break
+            return str_best_move
+        finally:
+            self.searchTime = time.perf_counter() - f_start
+
+    def countChildren(self, i_children):
+        """
+        Compte i_children états fils générés ; lève SearchTimeout si le budget de la
+        profondeur en cours (self.nodeLimit) est dépassé.
+        """
+        self.generated += i_children
+        if self.nodeLimit is not None and self.generated > self.nodeLimit:
+            raise SearchTimeout()
+
+    def searchRoot(self, i_depth, state: GameState):
+        """
+        Recherche à la profondeur i_depth depuis state ; retourne (valeur, action).
+        """
+        self.searchDepth = i_depth
+        if self.freezeGhosts:
+            t_root_cell = (state.data.layout.getLayoutId(), state.getPacmanPosition())
+            if self.rootCell != t_root_cell:
+                self.rootCell = t_root_cell
+                self.rootDistances = state.data.layout.getMoveTable().getDistances(state.getPacmanPosition())
+            self.freezeContext = (state.getPacmanPosition(), i_depth)
+        if self.workers > 1:
+            return self.searchRootInParallel(i_depth, state)
+        # une copie de travail neuve à chaque recherche
+        return self.maximise(i_depth, self.getSearchState(state))
+
+    def searchFrom(self, i_depth, t_state: GameState, i_agent_index, f_alpha=float('-inf')):
+        """
+        Valeur de t_state lorsque c'est à l'agent i_agent_index de jouer (au Pacman du niveau
+        suivant si i_agent_index vaut le nombre d'agents). f_alpha : valeur que Pacman est déjà
+        sûr d'obtenir à la racine (seul AlphaBetaAgent s'en sert).
+        """
+        if i_agent_index == t_state.getNumAgents():
+            return self.maximise(i_depth - 1, t_state)[0]
+        return self.minimise(i_depth, t_state, i_agent_index)[0]
+
+    def mergeGhostValues(self, t_state: GameState, l_actions, l_values):
+        """
+        Valeur du noeud t_state du premier fantome à partir des valeurs l_values de ses fils
+        (pour ses actions l_actions) : le minimum, le fantome jouant contre Pacman.
+        """
+        return min(l_values)
+
+    def getGhostProbabilities(self, t_state: GameState, i_agent_index, l_actions):
+        """
+        Probabilités des actions l_actions (données par getGhostActions) du fantome
+        i_agent_index : uniformes.
+        """
+        return [1 / len(l_actions)] * len(l_actions)
+
+    def getWorkerAgent(self):
+        """
+        Copie de l'agent envoyée aux processus du pool (sans pool à son tour).
+        """
+        t_agent = copy.copy(self)
+        t_agent.workers = 1
+        t_agent.deadline = None
+        return t_agent
+
+    def searchRootInParallel(self, i_depth, t_state: GameState):
+        """
+        Répartit la racine sur le pool de self.workers processus : une tâche par action de
+        Pacman ou, s'il y a moins d'actions que de processus, par couple (action de Pacman,
+        action du premier fantome). Les valeurs sont regroupées ici, et l'action choisie
+        comme le ferait maximise (la première de valeur maximale dans l'ordre des actions).
+        Dès qu'une action de Pacman est entièrement évaluée, l'alpha partagé est relevé. Avec
+        shareAlpha, les processus le relisent à chaque noeud (AlphaBetaAgent) : les tâches
+        en cours coupent aussitôt contre les actions déjà évaluées, pas seulement celles qui
+        commencent ensuite.
+        """
+        t_pool, v_alpha = getProcessPool(self.workers)
+        l_actions = t_state.getLegalActions(PACMAN)
+        d_ghost_actions = OrderedDict((str_action, [None]) for str_action in l_actions)
+        d_children = {}
+        if len(l_actions) < self.workers and t_state.getNumAgents() > 1:
+            for str_action in l_actions:
+                t_child = d_children[str_action] = t_state.getNextState(PACMAN, str_action, validate=False)
+                d_ghost_actions[str_action] = self.getGhostActions(t_child, PACMAN + 1, i_depth) or [None]
+
+        b_payload = packSearch(self.getWorkerAgent(), t_state)
+        f_time_left = None if self.deadline is None else self.deadline - time.perf_counter()
+        v_alpha.value = float('-inf')
+        d_futures = {}
+        for str_action, l_ghost_actions in d_ghost_actions.items():
+            for i_index, str_ghost_action in enumerate(l_ghost_actions):
+                t_future = t_pool.submit(searchRootTask, b_payload, str_action, str_ghost_action, f_time_left)
+                d_futures[t_future] = (str_action, i_index)
+
+        d_values = dict((str_action, [None] * len(l_ghost_actions))
+                        for str_action, l_ghost_actions in d_ghost_actions.items())
+        d_action_values = {}
+        try:
+            for t_future in concurrent.futures.as_completed(d_futures):
+                f_value, i_nodes = t_future.result()    # relève SearchTimeout si l'échéance est passée
+                self.nodes += i_nodes
+                str_action, i_index = d_futures[t_future]
+                d_values[str_action][i_index] = f_value
+                if None not in d_values[str_action]:
+                    if d_ghost_actions[str_action] == [None]:
+                        d_action_values[str_action] = f_value
+                    else:
+                        d_action_values[str_action] = self.mergeGhostValues(
+                            d_children[str_action], d_ghost_actions[str_action], d_values[str_action])
+                    if d_action_values[str_action] > v_alpha.value:
+                        v_alpha.value = d_action_values[str_action]
+        finally:
+            for t_future in d_futures:
+                t_future.cancel()
+
+        i_max_val, str_best_move = float('-inf'), ''
+        for str_action in l_actions:
+            if i_max_val < d_action_values[str_action]:
+                i_max_val, str_best_move = d_action_values[str_action], str_action
+        return i_max_val, str_best_move
+
+    def getGhostActions(self, t_state: GameState, i_agent_index, i_depth):
+        """
+        Actions du fantome i_agent_index explorées à i_depth tours de l'horizon : toutes ses
+        actions légales ou, en mode freezeGhosts, seulement la première s'il ne peut pas
+        influencer la recherche (voir isGhostRelevant). Sa branche ne se divise alors plus.
+        """
+        l_actions = t_state.getLegalActions(i_agent_index)
+        if self.freezeGhosts and len(l_actions) > 1 and not self.isGhostRelevant(t_state, i_agent_index, i_depth):
+            return l_actions[:1]
+        return l_actions
+
+    def isGhostRelevant(self, t_state: GameState, i_agent_index, i_depth):
+        """
+        Le fantome peut-il atteindre Pacman avant l'horizon ? D'ici là, le fantome joue i_depth
+        fois et Pacman i_depth - 1 fois : ils se rapprochent d'au plus 2 * i_depth cases. La
+        distance actuelle est minorée par la distance (dans le labyrinthe) du fantome à la
+        position de Pacman à la racine, moins les coups joués depuis par Pacman.
+        """
+        x, y = t_state.getGhostPosition(i_agent_index)
+        i_root_distance = self.rootDistances.get((int(x + 0.5), int(y + 0.5)))
+        if i_root_distance is None:
+            return True
+        i_pacman_moves = self.searchDepth - i_depth + 1
+        # - 1 : un fantome effrayé peut être entre deux cases
+        return i_root_distance - 1 - i_pacman_moves <= 2 * i_depth + self.freezeMargin
+
+    def getJointOutcomes(self, t_state: GameState, i_depth):
+        """
+        Issues du tour complet des fantomes depuis t_state (Pacman vient de jouer), à i_depth
+        tours de l'horizon : liste de couples (probabilité, état), chaque fantome jouant ses
+        actions (getGhostActions) au hasard. Une partie finie en cours de tour
+        est une issue (les fantomes suivants ne jouent pas). Les probabilités des actions
+        sont celles de getGhostProbabilities.
+        Les issues identiques sont fusionnées (probabilités sommées). Si aucun fantome ne peut
+        être mangé avant l'horizon (aucun n'est effrayé, aucune capsule à portée de Pacman),
+        les fantomes sont interchangeables : seul compte l'ensemble (multiset) de leurs états,
+        et deux fantomes qui échangent leurs cases donnent la même issue. Cela suppose une
+        fonction d'évaluation symétrique en les fantomes (comme scoreEvaluationFunction).
+        Les états sont créés par getNextState, même en mode inPlace.
+        """
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        l_outcomes = [(1.0, t_state)]
+        for i_agent_index in range(PACMAN + 1, t_state.getNumAgents()):
+            l_next_outcomes = []
+            for f_prob, t_outcome in l_outcomes:
+                if t_outcome.isWin() or t_outcome.isLose():
+                    l_next_outcomes.append((f_prob, t_outcome))
+                    continue
+                l_actions = self.getGhostActions(t_outcome, i_agent_index, i_depth)
+                l_probs = self.getGhostProbabilities(t_outcome, i_agent_index, l_actions)
+                self.countChildren(len(l_actions))
+                for str_action, f_action_prob in zip(l_actions, l_probs):
+                    l_next_outcomes.append((f_prob * f_action_prob,
+                                            t_outcome.getNextState(i_agent_index, str_action, validate=False)))
+            l_outcomes = l_next_outcomes
+
+        b_symmetric = self.areGhostsInterchangeable(t_state, i_depth)
+        d_merged = OrderedDict()    # clé de l'issue -> [probabilité, état]
+        for f_prob, t_outcome in l_outcomes:
+            l_ghosts = [(t_ghost.getPosition(), t_ghost.getDirection(), t_ghost.scaredTimer)
+                        for t_ghost in t_outcome.getGhostStates()]
+            if b_symmetric:
+                l_ghosts.sort()
+            t_key = (t_outcome.isWin(), t_outcome.isLose(), t_outcome.getScore(), tuple(l_ghosts))
+            if t_key in d_merged:
+                d_merged[t_key][0] += f_prob
+            else:
+                d_merged[t_key] = [f_prob, t_outcome]
+        self.jointOutcomes += len(l_outcomes)
+        self.jointMerged += len(l_outcomes) - len(d_merged)
+        return [tuple(l_outcome) for l_outcome in d_merged.values()]
+
+    def areGhostsInterchangeable(self, t_state: GameState, i_depth):
+        """
+        Les fantomes ne diffèrent que par leur position de départ, où ils retournent une fois
+        mangés : si aucun ne peut l'être avant l'horizon, ils sont interchangeables.
+        Pacman joue encore i_depth - 1 fois après t_state.
+        """
+        if any(t_ghost.scaredTimer > 0 for t_ghost in t_state.getGhostStates()):
+            return False
+        t_pacman = t_state.getPacmanPosition()
+        return all(util.manhattanDistance(t_pacman, t_capsule) >= i_depth for t_capsule in t_state.getCapsules())
+
+    def getSearchState(self, state: GameState):
+        """
+        Retourne l'état à partir duquel la recherche est lancée.
+        En mode inPlace, la recherche modifie l'état (makeMove/undoMove) : on travaille
+        donc sur une copie qui possède sa propre grille de nourriture.
+        """
+        if self.inPlace:
+            return state.deepCopy()
+        return state
+
+    def getChildren(self, t_state: GameState, i_agent_index, l_legal_actions=None):
+        """
+        Génère les couples (action, état fils) pour chaque action légale de l'agent
+        (ou pour l_legal_actions si l'appelant les a déjà calculées).
+
+        En mode inPlace, l'état fils est t_state lui-même, modifié par makeMove ; il est
+        restauré par undoMove dès que l'appelant passe à l'action suivante ou quitte la boucle.
+
+        Les actions venant de getLegalActions, on ne les fait pas revalider (validate=False).
+        En mode batch, tous les fils sont générés d'un coup par getSuccessors, sinon
+        un à un, au fur et à mesure que l'appelant les demande.
+
+        Lève SearchTimeout si l'échéance de la recherche (self.deadline) est passée, ou si le
+        budget de noeuds l'est (voir countChildren).
+        """
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if self.batch and not self.inPlace:
+            l_children = t_state.getSuccessors(i_agent_index, l_legal_actions)
+            self.countChildren(len(l_children))
+            yield from l_children
+            return
+
+        if l_legal_actions is None:
+            l_legal_actions = t_state.getLegalActions(i_agent_index)
+
+        # countChildren(1), écrit ici : c'est la boucle la plus fréquente de la recherche
+        if not self.inPlace:
+            for str_legal_action in l_legal_actions:
+                self.generated += 1
+                if self.nodeLimit is not None and self.generated > self.nodeLimit:
+                    raise SearchTimeout()
+                yield str_legal_action, t_state.getNextState(i_agent_index, str_legal_action, validate=False)
+            return
+
+        for str_legal_action in l_legal_actions:
+            self.generated += 1
+            if self.nodeLimit is not None and self.generated > self.nodeLimit:
+                raise SearchTimeout()
+            t_token = t_state.makeMove(i_agent_index, str_legal_action, validate=False)
+            try:
+                yield str_legal_action, t_state
+            finally:
+                t_state.undoMove(t_token)
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
@@ -81,7 +775,7 @@ class MinimaxAgent(MultiAgentSearchAgent):
         """
         "*** Selon le pseudocode présent sur wikipédia : https://fr.wikipedia.org/wiki/Algorithme_minimax***"
 
-        return self.maximise(self.depth, state)[1]  # maximise/minimise retourne (valeur, action)
+        return self.searchAction(state)
 
     def maximise(self, i_depth, t_state: GameState):
         """
@@ -95,9 +789,9 @@ class MinimaxAgent(MultiAgentSearchAgent):
 
         i_max_val, str_best_move = float('-inf'), ''
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        for str_legal_action in t_state.getLegalActions(PACMAN):    # pour chaque action légales
+        for str_legal_action, t_child in self.getChildren(t_state, PACMAN):    # pour chaque action légales
             i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                        t_state.getNextState(PACMAN, str_legal_action),
+                                                        t_child,
                                                         PACMAN+1)
             if i_max_val < i_temp_val:  # si la valeur déterminée est meilleure que la valeur maximale ...
                 i_max_val, str_best_move = i_temp_val, str_legal_action
@@ -113,27 +807,147 @@ class MinimaxAgent(MultiAgentSearchAgent):
         if i_depth == 0 or t_state.isWin() or t_state.isLose():
             return self.evaluationFunction(t_state), ''
 
+        if self.jointGhosts and i_agent_index == PACMAN + 1:
+            # tour joint des fantomes : le minimum sur les issues distinctes
+            return min(self.maximise(i_depth - 1, t_outcome)[0]
+                       for f_prob, t_outcome in self.getJointOutcomes(t_state, i_depth)), ''
+
         i_min_val, str_best_move = float('inf'), ''
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        for str_legal_action in t_state.getLegalActions(i_agent_index):  # pour chaque action légales d'un fantome
+        l_actions = self.getGhostActions(t_state, i_agent_index, i_depth) if self.freezeGhosts else None
+        for str_legal_action, t_child in self.getChildren(t_state, i_agent_index, l_actions):  # pour chaque action légales d'un fantome
             # Tant que l'index d'agent est plus petit que 2, c'est que l'on évalue un fantome -> appel à minimise
             if i_agent_index < t_state.getNumAgents()-1:
                 i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                            t_state.getNextState(i_agent_index, str_legal_action),
+                                                            t_child,
                                                             i_agent_index+1)
             else:
                 i_temp_val, str_temp_action = self.maximise(i_depth-1,
-                                                            t_state.getNextState(i_agent_index, str_legal_action))
+                                                            t_child)
             if i_min_val > i_temp_val:
                 i_min_val, str_best_move = i_temp_val, str_legal_action
 
         return i_min_val, str_best_move
 
 
+class TranspositionTable:
+    """
+    Table de transposition : associe à une clé (clé Zobrist de l'état, profondeur restante,
+    indice de l'agent) la valeur calculée, le meilleur coup et le type de la valeur
+    (EXACT, ou borne inférieure LOWER / supérieure UPPER si la recherche a été coupée).
+
+    La table garde au plus i_size entrées ; str_replace choisit qui est remplacé :
+      'lru'   : l'entrée utilisée le moins récemment
+      'depth' : table à adresses fixes (hash de la clé modulo i_size) ; une entrée n'y est
+                remplacée que par une entrée de profondeur restante au moins égale, ou
+                si elle date d'une recherche précédente
+
+    Une table peut servir à plusieurs recherches successives (newSearch) : chaque entrée
+    garde la génération (le numéro de la recherche) qui l'a stockée, et reuses compte les
+    succès sur des entrées d'une recherche précédente.
+    """
+    REPLACEMENTS = ('lru', 'depth')
+
+    def __init__(self, i_size=200000, str_replace='lru'):
+        if str_replace not in self.REPLACEMENTS:
+            raise Exception('Unknown transposition table replacement: ' + str(str_replace))
+        self.size = i_size
+        self.replace = str_replace
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """
+        Vide la table et remet les compteurs à zéro.
+        """
+        if self.replace == 'lru':
+            self.entries = OrderedDict()
+        else:
+            self.entries = [None] * self.size
+        self.probes, self.hits, self.stores, self.reuses = 0, 0, 0, 0
+
+    def newSearch(self):
+        """
+        Commence une nouvelle recherche en gardant les entrées : remet les compteurs à zéro
+        et passe à la génération suivante.
+        """
+        self.generation += 1
+        self.probes, self.hits, self.stores, self.reuses = 0, 0, 0, 0
+
+    def lookup(self, t_key):
+        """
+        Retourne (valeur, coup, type, génération) stocké pour t_key, ou None.
+        """
+        self.probes += 1
+        if self.replace == 'lru':
+            t_entry = self.entries.get(t_key)
+            if t_entry is None:
+                return None
+            self.entries.move_to_end(t_key)
+        else:
+            t_slot = self.entries[hash(t_key) % self.size]
+            if t_slot is None or t_slot[0] != t_key:
+                return None
+            t_entry = t_slot[1]
+        self.hits += 1
+        if t_entry[3] != self.generation:
+            self.reuses += 1
+        return t_entry
+
+    def store(self, t_key, f_value, str_move, i_flag):
+        self.stores += 1
+        t_entry = (f_value, str_move, i_flag, self.generation)
+        if self.replace == 'lru':
+            self.entries[t_key] = t_entry
+            self.entries.move_to_end(t_key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        else:
+            i_index = hash(t_key) % self.size
+            t_slot = self.entries[i_index]
+            # t_key[1] : profondeur restante de l'entrée
+            if (t_slot is None or t_slot[0] == t_key or t_slot[0][1] <= t_key[1]
+                    or t_slot[1][3] != self.generation):
+                self.entries[i_index] = (t_key, t_entry)
+
+    def __len__(self):
+        if self.replace == 'lru':
+            return len(self.entries)
+        return self.size - self.entries.count(None)
+
+
 class AlphaBetaAgent(MultiAgentSearchAgent):
     """
     Your minimax agent with alpha-beta pruning (question 3)
+
+    Options (-a) : tt=True active une table de transposition de ttSize entrées
+    (remplacement ttReplace : 'lru' ou 'depth', voir TranspositionTable).
+    reuse=True garde la table d'un coup à l'autre : la position réellement jouée a souvent
+    été explorée par la recherche précédente, dont les entrées (valeurs et meilleurs coups)
+    servent à nouveau ; tt.reuses compte les succès sur ces entrées. Avec freezeGhosts, une
+    entrée ne vaut que pour la case de la racine et la profondeur de la recherche qui l'a
+    calculée (freezeContext, dans la clé) : les fantomes figés en dépendent.
+    ordering=True trie les coups avant de les explorer (voir getOrderedActions) ; sans,
+    ils sont explorés dans l'ordre de getLegalActions.
+    Les compteurs nodes et cutoffs portent sur le dernier appel à getAction.
     """
+    # Les fils sont générés un à un : ceux qui suivent une coupure ne sont jamais créés
+    BATCH = False
+    # Nombre de coups killers gardés par ply
+    KILLERS = 2
+    # Taille au-delà de laquelle la table des meilleurs coups est vidée
+    BEST_MOVES_SIZE = 200000
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', tt = 'False', ttSize = '200000',
+                 ttReplace = 'lru', ordering = 'False', reuse = 'False', **kwargs):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, **kwargs)
+        self.tt = TranspositionTable(int(ttSize), ttReplace) if argToBool(tt) else None
+        self.reuse = argToBool(reuse)
+        self.ordering = argToBool(ordering)
+        self.bestMoves = {}     # (clé de l'état, agent) -> meilleur coup trouvé
+        self.killers = {}       # ply -> coups ayant provoqué une coupure à ce ply
+        self.history = {}       # (agent, position, coup) -> score d'historique
+        self.nodes, self.cutoffs = 0, 0
 
     def getAction(self, state: GameState):
         """
@@ -141,23 +955,147 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         """
         "*** Encore selon le pseudocode présent sur wikipédia : https://fr.wikipedia.org/wiki/Algorithme_minimax ***"
         "*** avec l'ajout des variables alpha et beta ***"
-        return self.maximise(self.depth, state)[1]  # maximise/minimise retourne (valeur, action)
+        self.nodes, self.cutoffs = 0, 0
+        if self.tt is not None:
+            if self.reuse:
+                self.tt.newSearch()
+            else:
+                self.tt.clear()
+        if self.ordering:
+            # les plies sont comptés depuis la racine : les killers ne valent que pour ce coup
+            self.killers = {}
+            # l'historique des coups précédents compte, mais de moins en moins
+            self.history = dict((t_key, i_score // 2) for t_key, i_score in self.history.items() if i_score > 1)
+            if len(self.bestMoves) > self.BEST_MOVES_SIZE:
+                self.bestMoves = {}
+        return self.searchAction(state)
+
+    def searchFrom(self, i_depth, t_state: GameState, i_agent_index, f_alpha=float('-inf')):
+        if i_agent_index == t_state.getNumAgents():
+            return self.maximise(i_depth - 1, t_state, f_alpha, float('inf'))[0]
+        return self.minimise(i_depth, t_state, i_agent_index, f_alpha, float('inf'))[0]
+
+    def getWorkerAgent(self):
+        """
+        Les processus du pool partent d'une table de transposition vide et sans la table
+        des meilleurs coups (trop grosse à envoyer à chaque recherche) ; killers et
+        historique, petits, sont envoyés.
+        """
+        t_agent = MultiAgentSearchAgent.getWorkerAgent(self)
+        if self.tt is not None:
+            t_agent.tt = TranspositionTable(self.tt.size, self.tt.replace)
+        t_agent.bestMoves = {}
+        return t_agent
+
+    def raiseAlpha(self, i_alpha):
+        """
+        Dans un processus du pool : i_alpha relevé à l'alpha partagé. Celui-ci est le score
+        qu'une autre action de Pacman obtient à la racine ; il borne donc tout le sous-arbre
+        exploré ici. Les coupures restant strictes, une action qui fait aussi bien que lui
+        garde sa valeur exacte, et le coup choisi est celui de la recherche séquentielle.
+        """
+        return max(i_alpha, self.rootAlpha.value)
+
+    def getOrderedActions(self, t_state: GameState, i_agent_index, i_depth, l_actions=None):
+        """
+        Retourne les actions légales de l'agent (ou l_actions) dans l'ordre où les explorer : d'abord le
+        meilleur coup trouvé pour cet état par une recherche précédente (variante principale
+        de l'itération précédente ou du tour précédent), puis les coups killers de ce ply,
+        puis selon la table d'historique ; à égalité, l'ordre de getLegalActions.
+        Retourne aussi le contexte (état, position de l'agent, ply) qui sert à mettre les
+        tables à jour (recordCutoff, recordBestMove).
+        """
+        t_node = (t_state.getKey(), i_agent_index)
+        if i_agent_index == PACMAN:
+            t_position = t_state.getPacmanPosition()
+        else:
+            t_position = t_state.getGhostPosition(i_agent_index)
+        i_ply = (self.searchDepth - i_depth) * t_state.getNumAgents() + i_agent_index
+        str_pv_move = self.bestMoves.get(t_node)
+        l_killers = self.killers.get(i_ply, ())
+
+        def orderKey(str_action):
+            return (str_action == str_pv_move, str_action in l_killers,
+                    self.history.get((i_agent_index, t_position, str_action), 0))
+        # sorted est stable, y compris avec reverse=True
+        if l_actions is None:
+            l_actions = t_state.getLegalActions(i_agent_index)
+        l_actions = sorted(l_actions, key=orderKey, reverse=True)
+        return l_actions, (t_node, t_position, i_ply)
+
+    def recordCutoff(self, t_context, i_depth, str_action):
+        """
+        str_action a provoqué une coupure : c'est un coup killer pour ce ply et son score
+        d'historique augmente (d'autant plus que le sous-arbre coupé était profond).
+        """
+        t_node, t_position, i_ply = t_context
+        l_killers = self.killers.setdefault(i_ply, [])
+        if str_action not in l_killers:
+            l_killers.insert(0, str_action)
+            del l_killers[self.KILLERS:]
+        t_history_key = (t_node[1], t_position, str_action)
+        self.history[t_history_key] = self.history.get(t_history_key, 0) + i_depth * i_depth
+
+    def recordBestMove(self, t_context, str_action):
+        if str_action:
+            self.bestMoves[t_context[0]] = str_action
+
+    def probe(self, t_key, i_alpha, i_beta):
+        """
+        Cherche t_key dans la table de transposition. Retourne (valeur, action) si l'entrée
+        suffit à conclure pour la fenêtre [i_alpha, i_beta], None sinon.
+        """
+        t_entry = self.tt.lookup(t_key)
+        if t_entry is None:
+            return None
+        f_value, str_move, i_flag, i_generation = t_entry
+        if i_flag == EXACT or (i_flag == LOWER and f_value >= i_beta) or (i_flag == UPPER and f_value <= i_alpha):
+            return f_value, str_move
+        return None
+
+    def record(self, t_key, f_value, str_move, i_alpha, i_beta):
+        """
+        Stocke le résultat d'une recherche lancée avec la fenêtre [i_alpha, i_beta] :
+        hors de la fenêtre, la valeur n'est qu'une borne (recherche coupée).
+        """
+        if f_value <= i_alpha:
+            i_flag = UPPER
+        elif f_value >= i_beta:
+            i_flag = LOWER
+        else:
+            i_flag = EXACT
+        self.tt.store(t_key, f_value, str_move, i_flag)
 
     def maximise(self, i_depth, t_state: GameState, i_alpha=float('-inf'), i_beta=float('inf')):
         """
         Partie maximalisante de l'algorithme de minimax avec alpha-beta prunning.
         Elle ne concerne que l'agent pacman (dont le but est de ne pas se faire manger par un fantome)
         """
+        self.nodes += 1
 
         # condition finale ; si profondeur atteinte ou état gagnant/perdant
         if i_depth == 0 or t_state.isWin() or t_state.isLose():
             return self.evaluationFunction(t_state), ''     # retourne un score et une action vide
 
+        if self.rootAlpha is not None:
+            i_alpha = self.raiseAlpha(i_alpha)
+
+        if self.tt is not None:
+            t_key = (t_state.getKey(), i_depth, PACMAN, self.freezeContext)
+            t_result = self.probe(t_key, i_alpha, i_beta)
+            if t_result is not None:
+                return t_result
+            i_alpha_init = i_alpha  # i_alpha évolue pendant la recherche
+
+        l_actions = None
+        if self.ordering:
+            l_actions, t_context = self.getOrderedActions(t_state, PACMAN, i_depth)
+
         i_max_val, str_best_move = float('-inf'), ''
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        for str_legal_action in t_state.getLegalActions(PACMAN):    # pour chaque action légales
+        for str_legal_action, t_child in self.getChildren(t_state, PACMAN, l_actions):    # pour chaque action légales
             i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                        t_state.getNextState(PACMAN, str_legal_action),
+                                                        t_child,
                                                         PACMAN+1,
                                                         i_alpha,
                                                         i_beta)
@@ -166,8 +1104,15 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
                 i_alpha = max(i_max_val, i_alpha)
 
             if i_max_val > i_beta:  # si la valeur déterminée est moin bonne qu'une déterminée précédemment...
-                return i_max_val, str_best_move     # ...pas besoin d'expendre l'arbre
+                self.cutoffs += 1
+                if self.ordering:
+                    self.recordCutoff(t_context, i_depth, str_legal_action)
+                break     # ...pas besoin d'expendre l'arbre
 
+        if self.ordering:
+            self.recordBestMove(t_context, str_best_move)
+        if self.tt is not None:
+            self.record(t_key, i_max_val, str_best_move, i_alpha_init, i_beta)
         return i_max_val, str_best_move
 
     def minimise(self, i_depth, t_state: GameState, i_agent_index, i_alpha, i_beta):
@@ -175,23 +1120,42 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         Partie minimalisante de l'algorithme de minimax avec alpha-beta prunning.
         Elle ne concerne que les agents fantomes (dont le but est d'atteindre pacman)
         """
+        self.nodes += 1
+
         # condition finale ; si profondeur atteinte ou état gagnant/perdant
         if i_depth == 0 or t_state.isWin() or t_state.isLose():
             return self.evaluationFunction(t_state), ''
 
+        if self.rootAlpha is not None:
+            i_alpha = self.raiseAlpha(i_alpha)
+
+        if self.jointGhosts and i_agent_index == PACMAN + 1:
+            return self.jointMinimise(i_depth, t_state, i_alpha, i_beta), ''
+
+        if self.tt is not None:
+            t_key = (t_state.getKey(), i_depth, i_agent_index, self.freezeContext)
+            t_result = self.probe(t_key, i_alpha, i_beta)
+            if t_result is not None:
+                return t_result
+            i_beta_init = i_beta  # i_beta évolue pendant la recherche
+
+        l_actions = self.getGhostActions(t_state, i_agent_index, i_depth) if self.freezeGhosts else None
+        if self.ordering:
+            l_actions, t_context = self.getOrderedActions(t_state, i_agent_index, i_depth, l_actions)
+
         i_min_val, str_best_move = float('inf'), ''
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        for str_legal_action in t_state.getLegalActions(i_agent_index):  # pour chaque action légales d'un fantome
+        for str_legal_action, t_child in self.getChildren(t_state, i_agent_index, l_actions):  # pour chaque action légales d'un fantome
             # Tant que l'index d'agent est plus petit que 2, c'est que l'on évalue un fantome -> appel à minimise
             if i_agent_index < t_state.getNumAgents()-1:
                 i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                            t_state.getNextState(i_agent_index, str_legal_action),
+                                                            t_child,
                                                             i_agent_index+1,
                                                             i_alpha,
                                                             i_beta)
             else:
                 i_temp_val, str_temp_action = self.maximise(i_depth-1,
-                                                            t_state.getNextState(i_agent_index, str_legal_action),
+                                                            t_child,
                                                             i_alpha,
                                                             i_beta)
             if i_min_val > i_temp_val:
@@ -199,14 +1163,87 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
                 i_beta = min(i_beta, i_min_val)
 
             if i_min_val < i_alpha:  # si la valeur trouvée est moin bonne que la précédente...
-                return i_min_val, str_best_move     # ...pas besoin d'étendre l'arbre
+                self.cutoffs += 1
+                if self.ordering:
+                    self.recordCutoff(t_context, i_depth, str_legal_action)
+                break     # ...pas besoin d'étendre l'arbre
 
+        if self.ordering:
+            self.recordBestMove(t_context, str_best_move)
+        if self.tt is not None:
+            self.record(t_key, i_min_val, str_best_move, i_alpha, i_beta_init)
         return i_min_val, str_best_move
 
+    def jointMinimise(self, i_depth, t_state: GameState, i_alpha, i_beta):
+        """
+        Tour joint des fantomes (jointGhosts) : le minimum sur les issues distinctes de
+        getJointOutcomes, avec les mêmes coupures que minimise. Les issues étant toutes
+        générées avant d'être explorées, ni la table de transposition ni le tri des coups
+        ne servent à ce niveau.
+        """
+        i_min_val = float('inf')
+        for f_prob, t_outcome in self.getJointOutcomes(t_state, i_depth):
+            i_temp_val = self.maximise(i_depth - 1, t_outcome, i_alpha, i_beta)[0]
+            if i_min_val > i_temp_val:
+                i_min_val = i_temp_val
+                i_beta = min(i_beta, i_min_val)
+
+            if i_min_val < i_alpha:
+                self.cutoffs += 1
+                break
+        return i_min_val
+
 class ExpectimaxAgent(MultiAgentSearchAgent):
     """
       Your expectimax agent (question 4)
+
+    Option (-a) : star=1 coupe les noeuds des fantomes par Star1 (voir starMinimise), ce qui demande que la fonction d'évaluation déclare des bornes (attribut
+    bounds). L'action choisie est la même que sans coupure. Le compteur nodes porte sur le
+    dernier appel à getAction.
+    factorGhosts=True calcule le dernier tour des fantomes avant l'horizon fantome par
+    fantome quand ils ne peuvent pas toucher Pacman (voir factoredExpectation), ce qui
+    demande une fonction d'évaluation séparable (attribut ghostTerm).
+    ghostModel='directional' pondère les actions des fantomes selon DirectionalGhost au lieu
+    de les supposer uniformes ('random'). Ses distributions sont gardées dans une table
+    (ghostAgents.DistributionTable), propre au labyrinthe, plutôt que recalculées à chaque
+    noeud. Les coupures star supposent des fantomes uniformes.
+    epsilon=p évalue directement (evaluationFunction) au lieu de le chercher tout fils d'un
+    noeud de hasard atteint avec une probabilité inférieure à p depuis la racine (voir
+    searchChance) ; discardedMass est la probabilité, en suivant les choix de Pacman, des
+    branches ainsi coupées lors de la dernière recherche, et prunedBranches leur nombre.
     """
+    # Marge (absolue) ajoutée aux fenêtres des fils : les arrondis ne peuvent pas faire
+    # passer une borne pour une valeur exacte, et l'action choisie reste la même
+    STAR_MARGIN = 1e-6
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', star = '0', factorGhosts = 'False',
+                 ghostModel = 'random', epsilon = '0', **kwargs):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, **kwargs)
+        self.star = int(star)
+        if self.star == 2:
+            # le sondage de Star2 ne coupe que sous une borne beta finie, que seul un joueur
+            # min pourrait donner : ici, il ne ferait que répéter Star1
+            raise Exception('Star2 pruning needs a min player (no finite beta in expectimax); use star=1')
+        if self.star not in (0, 1):
+            raise Exception('Unknown star pruning: ' + str(star))
+        if self.star and getattr(self.evaluationFunction, 'bounds', None) is None:
+            raise Exception('Star%d pruning needs an evaluation function with bounds' % self.star)
+        self.factorGhosts = argToBool(factorGhosts)
+        if self.factorGhosts and getattr(self.evaluationFunction, 'ghostTerm', None) is None:
+            raise Exception('Ghost factoring needs an evaluation function with a ghostTerm')
+        if ghostModel not in GHOST_MODELS:
+            raise Exception('Unknown ghost model: ' + str(ghostModel))
+        if self.star and ghostModel != 'random':
+            raise Exception('Star%d pruning needs uniform (random) ghosts' % self.star)
+        self.ghostModel = ghostModel
+        # table des distributions du modèle et labyrinthe pour lequel elle vaut ; None : uniforme
+        self.ghostTable, self.ghostTableLayout = None, None
+        self.epsilon = float(epsilon)
+        if self.epsilon and (self.star or self.workers > 1):
+            raise Exception('Epsilon pruning needs star=0 and workers=1')
+        # probabilité d'atteindre le noeud en cours depuis la racine (mode epsilon)
+        self.pathProbability = 1.0
+        self.discardedMass, self.prunedBranches = 0.0, 0
 
     def getAction(self, state: GameState):
         """
@@ -217,53 +1254,147 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         """
         "*** Encore selon le pseudocode présent sur wikipédia : https://fr.wikipedia.org/wiki/Algorithme_minimax ***"
         "*** avec l'utilisation des slides S6 page 31***"
-        return self.maximise(self.depth, state)[1]
+        self.nodes = 0
+        if self.ghostModel != 'random' and self.ghostTableLayout != state.data.layout.getLayoutId():
+            self.ghostTable = ghostAgents.DistributionTable(GHOST_MODELS[self.ghostModel](PACMAN + 1))
+            self.ghostTableLayout = state.data.layout.getLayoutId()
+        return self.searchAction(state)
 
-    def maximise(self, i_depth, t_state: GameState):
+    def getEvaluationBounds(self, t_state: GameState, i_depth):
+        """
+        Bornes (basse, haute) des valeurs de la fonction d'évaluation sous t_state, à i_depth
+        tours de l'horizon. L'attribut bounds de la fonction d'évaluation est soit un couple
+        (basse, haute), soit une fonction bounds(état, profondeur) qui le retourne.
+        """
+        t_bounds = self.evaluationFunction.bounds
+        if callable(t_bounds):
+            return t_bounds(t_state, i_depth)
+        return t_bounds
+
+    def mergeGhostValues(self, t_state: GameState, l_actions, l_values):
+        """
+        Espérance des valeurs, sommées dans le même ordre que minimise (mêmes arrondis).
+        """
+        i_sum_val = 0
+        for i_prob, i_temp_val in zip(self.getGhostProbabilities(t_state, PACMAN + 1, l_actions), l_values):
+            i_sum_val += i_prob * i_temp_val
+        return i_sum_val
+
+    def getGhostProbabilities(self, t_state: GameState, i_agent_index, l_actions):
+        """
+        Probabilités des actions l_actions du fantome : celles de la table du modèle
+        (ghostModel), ou uniformes. Un fantome gelé (freezeGhosts) joue sa seule action.
+        """
+        if self.ghostTable is None or len(l_actions) == 1:
+            return MultiAgentSearchAgent.getGhostProbabilities(self, t_state, i_agent_index, l_actions)
+        return self.ghostTable.getDistribution(t_state, i_agent_index)
+
+    def searchRoot(self, i_depth, state: GameState):
+        self.pathProbability = 1.0
+        self.discardedMass, self.prunedBranches = 0.0, 0
+        return MultiAgentSearchAgent.searchRoot(self, i_depth, state)
+
+    def searchChance(self, i_prob, i_depth, t_child, i_agent_index):
+        """
+        Valeur du fils t_child, de probabilité i_prob, d'un noeud de hasard (mode epsilon) ;
+        i_agent_index joue ensuite (Pacman du niveau suivant si c'est le nombre d'agents).
+        Si la probabilité d'atteindre t_child depuis la racine est sous self.epsilon, sa
+        valeur est celle de la fonction d'évaluation, et sa probabilité est perdue
+        (discardedMass).
+        """
+        f_path_probability = self.pathProbability * i_prob
+        if f_path_probability < self.epsilon:
+            self.discardedMass += f_path_probability
+            self.prunedBranches += 1
+            return self.evaluationFunction(t_child)
+        f_parent_probability, self.pathProbability = self.pathProbability, f_path_probability
+        i_temp_val = self.searchFrom(i_depth, t_child, i_agent_index)
+        self.pathProbability = f_parent_probability
+        return i_temp_val
+
+    def maximise(self, i_depth, t_state: GameState, f_alpha=float('-inf'), f_beta=float('inf')):
         """
         Partie maximalisante de l'algorithme de minimax.
         Elle ne concerne que l'agent pacman (dont le but est de ne pas se faire manger par un fantome)
+        La fenêtre [f_alpha, f_beta] ne sert qu'en mode star (infinie sinon).
         """
+        self.nodes += 1
 
         # condition finale ; si profondeur atteinte ou état gagnant/perdant
         if i_depth == 0 or t_state.isWin() or t_state.isLose():
             return self.evaluationFunction(t_state), ''     # retourne un score et une action vide
 
         i_max_val, str_best_move = float('-inf'), ''
+        # mode epsilon : masse perdue avant ce noeud, et sous le meilleur fils
+        f_discarded_mass, f_best_mass = self.discardedMass, 0.0
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        for str_legal_action in t_state.getLegalActions(PACMAN):    # pour chaque action légales
+        for str_legal_action, t_child in self.getChildren(t_state, PACMAN):    # pour chaque action légales
+            self.discardedMass = 0.0
             i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                        t_state.getNextState(PACMAN, str_legal_action),
-                                                        PACMAN+1)
+                                                        t_child,
+                                                        PACMAN+1,
+                                                        max(f_alpha, i_max_val),
+                                                        f_beta)
             if i_max_val < i_temp_val:  # si la valeur déterminée est meilleure que la valeur maximale ...
                 i_max_val, str_best_move = i_temp_val, str_legal_action
+                f_best_mass = self.discardedMass
 
+            if i_max_val >= f_beta:     # borne inférieure : le noeud parent est déjà coupé
+                break
+
+        self.discardedMass = f_discarded_mass + f_best_mass
         return i_max_val, str_best_move
 
-    def minimise(self, i_depth, t_state: GameState, i_agent_index):
+    def minimise(self, i_depth, t_state: GameState, i_agent_index, f_alpha=float('-inf'), f_beta=float('inf')):
         """
         La méthode garde le nom de minimise même si il est plus convenable de lui attribuer un autre nom
         """
+        self.nodes += 1
+
         # condition finale ; si profondeur atteinte ou état gagnant/perdant
         if i_depth == 0 or t_state.isWin() or t_state.isLose():
             return self.evaluationFunction(t_state), ''
 
+        if self.factorGhosts and i_depth == 1 and self.areGhostsIndependent(t_state, i_agent_index):
+            return self.factoredExpectation(t_state, i_agent_index), ''
+
+        if self.jointGhosts and i_agent_index == PACMAN + 1:
+            # tour joint des fantomes : l'espérance sur les issues distinctes (sans coupure star)
+            i_sum_val = 0
+            for f_prob, t_outcome in self.getJointOutcomes(t_state, i_depth):
+                if self.epsilon:
+                    i_sum_val += f_prob * self.searchChance(f_prob, i_depth, t_outcome, t_state.getNumAgents())
+                else:
+                    i_sum_val += f_prob * self.maximise(i_depth - 1, t_outcome)[0]
+            return i_sum_val, ''
+
+        if self.star:
+            return self.starMinimise(i_depth, t_state, i_agent_index, f_alpha, f_beta), ''
+
         i_sum_val, str_best_move = 0, ''
         # Pacman à un indice 0, les autres fantomes ont un indice de 1 à 2
-        l_next_legals_actions = t_state.getLegalActions(i_agent_index)
-        for str_legal_action in l_next_legals_actions:  # pour chaque action légales d'un fantome
-            i_prob = 1 / len(l_next_legals_actions)     # probabilité d'une action
+        l_next_legals_actions = self.getGhostActions(t_state, i_agent_index, i_depth)
+        l_probs = None
+        if self.ghostTable is not None:
+            l_probs = self.getGhostProbabilities(t_state, i_agent_index, l_next_legals_actions)
+        for i_child, (str_legal_action, t_child) in enumerate(
+                self.getChildren(t_state, i_agent_index, l_next_legals_actions)):  # pour chaque action légales d'un fantome
+            # probabilité d'une action
+            i_prob = 1 / len(l_next_legals_actions) if l_probs is None else l_probs[i_child]
+            if self.epsilon:
+                i_temp_val = self.searchChance(i_prob, i_depth, t_child, i_agent_index + 1)
+                i_sum_val += i_prob * i_temp_val
             # Tant que l'index d'agent est plus petit que 2, c'est que l'on évalue un fantome -> appel à minimise
-            if i_agent_index < t_state.getNumAgents()-1:
+            elif i_agent_index < t_state.getNumAgents()-1:
 
                 i_temp_val, str_temp_action = self.minimise(i_depth,
-                                                            t_state.getNextState(i_agent_index, str_legal_action),
+                                                            t_child,
                                                             i_agent_index+1)
                 i_sum_val += i_prob * i_temp_val    # selon la formule du slide : sum = P(a) * value (Result(s,a))
 
             else:
                 i_temp_val, str_temp_action = self.maximise(i_depth-1,
-                                                            t_state.getNextState(i_agent_index, str_legal_action))
+                                                            t_child)
                 i_sum_val += i_prob * i_temp_val    # selon la formule du slide : sum = P(a) * value (Result(s,a))
 
             if i_sum_val > i_temp_val:
@@ -271,6 +1402,263 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
 
         return i_sum_val, str_best_move
 
+    def areGhostsIndependent(self, t_state: GameState, i_agent_index):
+        """
+        Les fantomes i_agent_index et suivants sont-ils indépendants pendant ce tour ? Les
+        fantomes ne se gênent pas entre eux ; seul un fantome qui touche Pacman (et finit la
+        partie, ou se fait manger) change ce que deviennent les autres. Un fantome avance d'au
+        plus une case par coup : à plus de 1 + COLLISION_TOLERANCE de Pacman, il ne le touche pas.
+        """
+        t_pacman_position = t_state.getPacmanPosition()
+        return all(manhattanDistance(t_pacman_position, t_state.getGhostPosition(i_ghost)) > 1 + COLLISION_TOLERANCE
+                   for i_ghost in range(i_agent_index, t_state.getNumAgents()))
+
+    def factoredExpectation(self, t_state: GameState, i_agent_index):
+        """
+        Valeur du dernier tour des fantomes avant l'horizon (i_depth == 1), les fantomes
+        i_agent_index et suivants étant indépendants (areGhostsIndependent). La fonction
+        d'évaluation déclare par son attribut ghostTerm(état, indice) la part de chaque
+        fantome : le changement de l'évaluation quand des fantomes bougent est la somme des
+        changements de leurs parts. L'espérance sur le produit des actions des fantomes est
+        alors l'évaluation de t_state plus, pour chaque fantome, l'espérance du changement de
+        sa part quand il joue seul : la somme des nombres d'actions, et non plus leur produit,
+        d'états fils.
+        """
+        f_ghost_term = self.evaluationFunction.ghostTerm
+        i_sum_val = self.evaluationFunction(t_state)
+        for i_ghost in range(i_agent_index, t_state.getNumAgents()):
+            l_next_legals_actions = self.getGhostActions(t_state, i_ghost, 1)
+            l_probs = self.getGhostProbabilities(t_state, i_ghost, l_next_legals_actions)
+            f_term = f_ghost_term(t_state, i_ghost)
+            for i_child, (str_legal_action, t_child) in enumerate(
+                    self.getChildren(t_state, i_ghost, l_next_legals_actions)):
+                self.nodes += 1
+                i_sum_val += l_probs[i_child] * (f_ghost_term(t_child, i_ghost) - f_term)
+        return i_sum_val
+
+    def starMinimise(self, i_depth, t_state: GameState, i_agent_index, f_alpha, f_beta):
+        """
+        Valeur du noeud du fantome i_agent_index, coupé par Star1 (Ballard) dès que la
+        moyenne partielle, complétée par les bornes de la fonction d'évaluation, sort de la
+        fenêtre [f_alpha, f_beta] : la valeur retournée n'est alors qu'une borne (<= f_alpha
+        ou >= f_beta), qui ne change pas la décision du parent.
+        Sans coupure, la moyenne est sommée comme dans minimise (même valeur exacte).
+        """
+        l_next_legals_actions = self.getGhostActions(t_state, i_agent_index, i_depth)
+        i_prob = 1 / len(l_next_legals_actions)
+        i_children = len(l_next_legals_actions)
+        f_low, f_high = self.getEvaluationBounds(t_state, i_depth)
+        b_last_ghost = i_agent_index == t_state.getNumAgents() - 1
+
+        i_sum_val = 0
+        for i_child, (str_legal_action, t_child) in enumerate(
+                self.getChildren(t_state, i_agent_index, l_next_legals_actions)):
+            # ce que les fils suivants peuvent encore apporter, au pire et au mieux
+            f_rest_low = i_prob * (i_children - i_child - 1) * f_low
+            f_rest_high = i_prob * (i_children - i_child - 1) * f_high
+            f_child_alpha = (f_alpha - i_sum_val - f_rest_high) / i_prob - self.STAR_MARGIN
+            f_child_beta = (f_beta - i_sum_val - f_rest_low) / i_prob + self.STAR_MARGIN
+            if f_child_alpha >= f_high:    # même au mieux, ce fils ne ramène pas la moyenne au-dessus de f_alpha
+                return i_sum_val + i_prob * f_high + f_rest_high
+            if f_child_beta <= f_low:
+                return i_sum_val + i_prob * f_low + f_rest_low
+            if b_last_ghost:
+                i_temp_val = self.maximise(i_depth - 1, t_child, f_child_alpha, f_child_beta)[0]
+            else:
+                i_temp_val = self.minimise(i_depth, t_child, i_agent_index + 1, f_child_alpha, f_child_beta)[0]
+            if i_temp_val <= f_child_alpha:
+                return i_sum_val + i_prob * i_temp_val + f_rest_high
+            if i_temp_val >= f_child_beta:
+                return i_sum_val + i_prob * i_temp_val + f_rest_low
+            i_sum_val += i_prob * i_temp_val
+
+        return i_sum_val
+
+class MCTSNode:
+    """
+    Noeud de l'arbre de MCTSAgent, où c'est à Pacman de jouer. Pour chaque action légale :
+    nombre de visites, somme des valeurs obtenues et noeud fils (None tant qu'il n'est pas créé).
+
+    Un noeud correspond à une suite d'actions de Pacman, quelles que soient celles des
+    fantomes (tirées à nouveau à chaque itération) : la position de Pacman ne dépend que de
+    ses propres actions, donc ses actions légales sont les mêmes dans tous les états du noeud.
+    """
+    # un noeud par itération : pas de __dict__ par instance
+    __slots__ = ('actions', 'visits', 'actionVisits', 'actionValues', 'children')
+
+    def __init__(self, l_actions):
+        self.actions = l_actions
+        self.visits = 0
+        self.actionVisits = [0] * len(l_actions)
+        self.actionValues = [0.0] * len(l_actions)
+        self.children = [None] * len(l_actions)
+
+class MCTSAgent(MultiAgentSearchAgent):
+    """
+    Agent Monte Carlo Tree Search (UCT) : chaque itération descend l'arbre en choisissant
+    l'action de Pacman par UCT et en tirant celles des fantomes selon le modèle ghostModel
+    ('random' : RandomGhost, 'directional' : DirectionalGhost), ajoute un noeud, puis termine
+    par une partie aléatoire jusqu'à l'horizon de self.depth tours complets, évaluée par
+    self.evaluationFunction. L'action jouée est la plus visitée à la racine. Comme pour
+    ExpectimaxAgent, les distributions de DirectionalGhost sont gardées dans une table
+    (ghostAgents.DistributionTable) propre au labyrinthe.
+
+    Le budget est de iterations itérations ou, si timeLimit est donné, le temps accordé au
+    coup (voir getTimeBudget) ; maxNodes borne en plus le nombre de coups joués (makeMove)
+    par coup, vérifié entre deux itérations. Toutes les itérations travaillent sur une seule copie de l'état
+    (makeMove/undoMove) : ni la descente ni les parties aléatoires ne créent de GameState.
+    exploration : constante de UCT, les valeurs étant ramenées entre 0 et 1.
+    seed : graine des tirages (aléatoire par défaut).
+    Les options de MultiAgentSearchAgent propres à la recherche en profondeur
+    (UNSUPPORTED_OPTIONS) sont refusées plutôt qu'ignorées.
+    Les compteurs iterationsDone et nodes portent sur le dernier coup.
+    """
+    # Options de MultiAgentSearchAgent sans effet sur MCTS
+    UNSUPPORTED_OPTIONS = ('inPlace', 'batch', 'maxDepth', 'workers', 'freezeGhosts', 'freezeMargin', 'jointGhosts')
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '5', iterations = '200',
+                 exploration = '1.4', ghostModel = 'random', seed = None, **kwargs):
+        l_unsupported = [str_option for str_option in self.UNSUPPORTED_OPTIONS if str_option in kwargs]
+        if l_unsupported:
+            raise ValueError('MCTSAgent does not support the option(s): ' + ', '.join(l_unsupported))
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, **kwargs)
+        if ghostModel not in GHOST_MODELS:
+            raise Exception('Unknown ghost model: ' + str(ghostModel))
+        self.iterations = int(iterations)
+        self.exploration = float(exploration)
+        self.ghostModel = ghostModel
+        # table des distributions du modèle et labyrinthe pour lequel elle vaut ; None : uniforme
+        self.ghostTable, self.ghostTableLayout = None, None
+        self.random = random.Random(None if seed is None else int(seed))
+        self.iterationsDone, self.nodes = 0, 0
+        self.minValue, self.maxValue = float('inf'), float('-inf')
+
+    def getAction(self, state: GameState):
+        """
+        Returns the action most visited by self.iterations UCT iterations (or as many as
+        the time budget allows)
+        """
+        f_start = time.perf_counter()
+        if self.ghostModel != 'random' and self.ghostTableLayout != state.data.layout.getLayoutId():
+            self.ghostTable = ghostAgents.DistributionTable(GHOST_MODELS[self.ghostModel](PACMAN + 1))
+            self.ghostTableLayout = state.data.layout.getLayoutId()
+        t_root = MCTSNode(state.getLegalActions(PACMAN))
+        t_state = state.deepCopy()      # copie de travail, modifiée en place
+        self.nodes, self.iterationsDone, self.generated = 1, 0, 0
+        self.depthReached = self.depth     # horizon des parties aléatoires
+        self.minValue, self.maxValue = float('inf'), float('-inf')
+        f_budget = self.getTimeBudget()
+        f_deadline = None if f_budget is None else f_start + f_budget
+        while True:
+            if f_deadline is None:
+                if self.iterationsDone >= self.iterations:
+                    break
+            elif self.iterationsDone > 0 and time.perf_counter() > f_deadline:
+                break
+            if self.maxNodes is not None and self.iterationsDone > 0 and self.generated >= self.maxNodes:
+                break
+            self.iterate(t_root, t_state)
+            self.iterationsDone += 1
+        self.searchTime = time.perf_counter() - f_start
+
+        i_best_visits, str_best_move = -1, Directions.STOP
+        for str_action, i_visits in zip(t_root.actions, t_root.actionVisits):
+            if i_visits > i_best_visits:
+                i_best_visits, str_best_move = i_visits, str_action
+        return str_best_move
+
+    def iterate(self, t_root: MCTSNode, t_state: GameState):
+        """
+        Une itération depuis la racine t_root, dont l'état est t_state : sélection,
+        expansion, partie aléatoire et remontée de la valeur. t_state est restauré.
+        """
+        l_tokens = []
+        l_path = []     # (noeud, indice de l'action choisie)
+        t_node = t_root
+        i_depth = self.depth
+        try:
+            # sélection : on descend tant que l'on est dans l'arbre
+            while t_node is not None and i_depth > 0 and not (t_state.isWin() or t_state.isLose()):
+                i_action = self.selectAction(t_node)
+                l_path.append((t_node, i_action))
+                l_tokens.append(t_state.makeMove(PACMAN, t_node.actions[i_action], validate=False))
+                self.playGhosts(t_state, l_tokens)
+                i_depth -= 1
+                t_parent, t_node = t_node, t_node.children[i_action]
+                if t_node is None and i_depth > 0 and not (t_state.isWin() or t_state.isLose()):
+                    # expansion : un nouveau noeud par itération
+                    t_parent.children[i_action] = MCTSNode(t_state.getLegalActions(PACMAN))
+                    self.nodes += 1
+            # partie aléatoire jusqu'à l'horizon
+            while i_depth > 0 and not (t_state.isWin() or t_state.isLose()):
+                l_tokens.append(t_state.makeMove(PACMAN, self.rolloutAction(t_state), validate=False))
+                self.playGhosts(t_state, l_tokens)
+                i_depth -= 1
+            f_value = self.evaluationFunction(t_state)
+        finally:
+            self.generated += len(l_tokens)
+            for t_token in reversed(l_tokens):
+                t_state.undoMove(t_token)
+
+        self.minValue, self.maxValue = min(self.minValue, f_value), max(self.maxValue, f_value)
+        for t_node, i_action in l_path:
+            t_node.visits += 1
+            t_node.actionVisits[i_action] += 1
+            t_node.actionValues[i_action] += f_value
+
+    def selectAction(self, t_node: MCTSNode):
+        """
+        Indice de l'action choisie par UCT : d'abord les actions jamais essayées, puis celle
+        qui maximise valeur moyenne (ramenée entre 0 et 1) + exploration * sqrt(ln N / n).
+        """
+        for i_action, i_visits in enumerate(t_node.actionVisits):
+            if i_visits == 0:
+                return i_action
+        f_range = self.maxValue - self.minValue
+        f_log_visits = math.log(t_node.visits)
+        f_best, i_best_action = float('-inf'), 0
+        for i_action, i_visits in enumerate(t_node.actionVisits):
+            f_mean = t_node.actionValues[i_action] / i_visits
+            f_mean = (f_mean - self.minValue) / f_range if f_range > 0 else 0.5
+            f_uct = f_mean + self.exploration * math.sqrt(f_log_visits / i_visits)
+            if f_uct > f_best:
+                f_best, i_best_action = f_uct, i_action
+        return i_best_action
+
+    def playGhosts(self, t_state: GameState, l_tokens):
+        """
+        Joue en place un coup de chaque fantome, tiré selon le modèle ; ajoute les jetons
+        de undoMove à l_tokens.
+        """
+        for i_agent_index in range(PACMAN + 1, t_state.getNumAgents()):
+            if t_state.isWin() or t_state.isLose():
+                break
+            str_action = self.sampleGhostAction(t_state, i_agent_index)
+            l_tokens.append(t_state.makeMove(i_agent_index, str_action, validate=False))
+
+    def sampleGhostAction(self, t_state: GameState, i_agent_index):
+        l_legal_actions = t_state.getLegalActions(i_agent_index)
+        if self.ghostTable is None:
+            # la distribution de RandomGhost, sans construire de Counter
+            return self.random.choice(l_legal_actions)
+        # probabilités dans l'ordre de getLegalActions
+        l_probs = self.ghostTable.getDistribution(t_state, i_agent_index)
+        f_random = self.random.random()
+        for str_action, f_prob in zip(l_legal_actions, l_probs):
+            f_random -= f_prob
+            if f_random <= 0:
+                return str_action
+        return str_action
+
+    def rolloutAction(self, t_state: GameState):
+        """
+        Action de Pacman pendant la partie aléatoire : uniforme, sans s'arrêter s'il peut bouger.
+        """
+        l_legal_actions = t_state.getLegalActions(PACMAN)
+        if len(l_legal_actions) > 1 and Directions.STOP in l_legal_actions:
+            l_legal_actions = [str_action for str_action in l_legal_actions if str_action != Directions.STOP]
+        return self.random.choice(l_legal_actions)
+
 def betterEvaluationFunction(state: GameState):
     """
     Your extreme ghost-hunting, pellet-nabbing, food-gobbling, unstoppable
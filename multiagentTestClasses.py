@@ -29,6 +29,7 @@ pp = PrettyPrinter()
 
 from game import Agent
 from pacman import GameState
+from pacman import ExploredCounter
 from ghostAgents import RandomGhost, DirectionalGhost
 import random
 import math
@@ -48,7 +49,7 @@ class MultiagentTreeState(object):
         self.problem = problem
         self.state = state
 
-    def getNextState(self, agentIndex, action):
+    def getNextState(self, agentIndex, action, validate=True):
         if VERBOSE:
             print("getNextState(%s, %s, %s) -> %s" % (self.state, agentIndex,
                                                            action, self.problem.stateToChildMap[self.state][action]))
@@ -56,6 +57,11 @@ class MultiagentTreeState(object):
         self.problem.generatedStates.add(child)
         return MultiagentTreeState(self.problem, child)
 
+    def getSuccessors(self, agentIndex, actions=None):
+        if actions is None:
+            actions = self.getLegalActions(agentIndex)
+        return [(action, self.getNextState(agentIndex, action)) for action in actions]
+
     def getScore(self):
         if VERBOSE:
             print("getScore(%s) -> %s" %
@@ -178,6 +184,9 @@ class GradingAgent(Agent):
         # keep track of elapsed moves
         self.stepCount = 0
         self.seed = seed
+        # the number of states explored is part of the grade
+        if GameState.exploredTracker is None:
+            GameState.setExploredTracker(ExploredCounter())
 
     def registerInitialState(self, state):
         if 'registerInitialState' in dir(self.studentAgent):
@@ -261,6 +270,9 @@ class PolyAgent(Agent):
         self.partialPlyBugLists = []
         self.seed = seed
         self.stepCount = 0
+        # the reference numbers of states explored are recorded with the actions
+        if GameState.exploredTracker is None:
+            GameState.setExploredTracker(ExploredCounter())
 
     def select(self, list, indices):
         """
@@ -576,3 +588,93 @@ class EvalAgentTest(testClasses.TestCase):
         handle.write('# File intentionally blank.\n')
         handle.close()
         return True
+
+
+class StateCodecTest(testClasses.TestCase):
+    """
+    Round trips game states through GameState.encode / GameState.decode:
+    random mid-game states of every shipped layout (or of layoutNames), with
+    and without their capsules, must come back equal, with the same hash and
+    key, the same encoding, and on the same (registered) layout.
+    """
+
+    def __init__(self, question, testDict):
+        super(StateCodecTest, self).__init__(question, testDict)
+        self.bitboards = testDict['bitboards'] == 'True'
+        self.numStates = int(testDict['numStates'])
+        self.seed = int(testDict['randomSeed'])
+        if 'layoutNames' in testDict:
+            self.layoutNames = testDict['layoutNames'].split()
+        else:
+            self.layoutNames = sorted(name[:-len('.lay')] for name in os.listdir('layouts')
+                                      if name.endswith('.lay'))
+
+    def getStates(self, lay, rng):
+        """
+        Returns the states of a random playout of lay, every few moves, and
+        its last state (possibly a win or a loss).
+        """
+        state = GameState()
+        state.initialize(lay, lay.getNumGhosts())
+        states = [state]
+        agentIndex = 0
+        for move in range(8 * self.numStates):
+            if state.isWin() or state.isLose():
+                break
+            state = state.getNextState(agentIndex, rng.choice(state.getLegalActions(agentIndex)))
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+            if rng.random() < 0.15:
+                states.append(state)
+        return states[:self.numStates] + [state]
+
+    def checkState(self, state, name):
+        encoded = state.encode()
+        decoded = GameState.decode(encoded)
+        lay = state.data.layout
+        problems = []
+        if decoded != state:
+            problems.append('decoded state differs')
+        if hash(decoded) != hash(state) or decoded.getKey() != state.getKey():
+            problems.append('hash or key differs')
+        if decoded.isWin() != state.isWin() or decoded.isLose() != state.isLose():
+            problems.append('win/lose flags differ')
+        if decoded.encode() != encoded:
+            problems.append('re-encoding differs')
+        if (decoded.data.layout is not layout.getRegisteredLayout(lay.getLayoutId())
+                or decoded.data.layout.getLayoutId() != lay.getLayoutId()
+                or decoded.data.layout.layoutText != lay.layoutText
+                or decoded.data.layout.bitboards != lay.bitboards):
+            problems.append('layout not preserved')
+        for problem in problems:
+            self.addMessage('%s: %s for state\n%s' % (name, problem, state))
+        return len(problems) == 0
+
+    def execute(self, grades, moduleDict, solutionDict):
+        rng = random.Random(self.seed)
+        passed = True
+        checked, withCapsules = 0, 0
+        for layoutName in self.layoutNames:
+            text = layout.getLayout(layoutName).layoutText
+            for capsules in (True, False):
+                if not capsules:
+                    if 'o' not in ''.join(text):
+                        continue
+                    text = [line.replace('o', ' ') for line in text]
+                lay = layout.Layout(text, self.bitboards)
+                layout.registerLayout(lay)
+                for state in self.getStates(lay, rng):
+                    passed = self.checkState(state, layoutName) and passed
+                    checked += 1
+                    withCapsules += len(state.getCapsules()) > 0
+        self.addMessage('%d states checked (%d with capsules left), bitboards=%s' %
+                        (checked, withCapsules, self.bitboards))
+        if passed and 0 < withCapsules < checked:
+            return self.testPass(grades)
+        return self.testFail(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# File intentionally blank.\n')
+        handle.close()
+        return True
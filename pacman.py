@@ -44,10 +44,15 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import Configuration
+from game import AgentState
 from util import nearestPoint
 from util import manhattanDistance
 import util
 import layout
+import bisect
+import struct
+import threading
 import sys
 import types
 import time
@@ -73,18 +78,33 @@ class GameState:
 
     Note that in classic Pacman, Pacman is always agent 0.
     """
+    __slots__ = ('data',)
 
     ####################################################
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable keeps track of which states have had getNextState called
+    # (None: nobody is tracking them, see setExploredTracker)
+    exploredTracker = None
+
+    def setExploredTracker(tracker):
+        """
+        Installs the object notified (tracker.add(state)) of the parent and the
+        child of every getNextState call, e.g. an ExploredCounter, or None.
+        """
+        GameState.exploredTracker = tracker
+    setExploredTracker = staticmethod(setExploredTracker)
 
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        """
+        Returns the set of distinct states explored since the last call, as
+        recorded by the tracker, and starts a new one.  Without a tracker the
+        set is empty.
+        """
+        if GameState.exploredTracker is None:
+            return set()
+        return GameState.exploredTracker.getAndReset()
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions(self, agentIndex=0) -> List[str]:
@@ -100,9 +120,13 @@ class GameState:
         else:
             return GhostRules.getLegalActions(self, agentIndex)
 
-    def getNextState(self, agentIndex, action):
+    def getNextState(self, agentIndex, action, validate=True):
         """
         Returns the child state after the specified agent takes the action.
+
+        Search code that takes its actions from getLegalActions can pass
+        validate=False to skip checking the action again; the outcome of an
+        illegal action is then undefined.  The Game always validates.
         """
         # Check that children exist
         if self.isWin() or self.isLose():
@@ -110,29 +134,124 @@ class GameState:
 
         # Copy current state
         state = GameState(self)
+        state._applyMove(agentIndex, action, validate=validate)
+        tracker = GameState.exploredTracker
+        if tracker is not None:
+            tracker.add(self)
+            tracker.add(state)
+        return state
 
+    def getSuccessors(self, agentIndex, actions=None):
+        """
+        Returns the (action, child state) pairs of all the legal actions of the
+        agent (or of the given actions, trusted to be legal), like as many calls
+        to getNextState but sharing the work that does not depend on the action.
+        """
+        if self.isWin() or self.isLose():
+            return []
+        if actions is None:
+            actions = self.getLegalActions(agentIndex)
+
+        agentState = self.data.agentStates[agentIndex]
+        if agentIndex == 0:
+            speed = PacmanRules.PACMAN_SPEED
+        else:
+            speed = GhostRules.getSpeed(agentState)
+        nextConfigurations = self.data.layout.getMoveTable().getNextConfigurations(
+            agentState.configuration, actions, speed)
+        successors = []
+        for action, nextConfiguration in zip(actions, nextConfigurations):
+            state = GameState(self)
+            state._applyMove(agentIndex, action, validate=False, nextConfiguration=nextConfiguration)
+            successors.append((action, state))
+
+        tracker = GameState.exploredTracker
+        if tracker is not None:
+            tracker.add(self)
+            for action, state in successors:
+                tracker.add(state)
+        return successors
+
+    def makeMove(self, agentIndex, action, validate=True):
+        """
+        Applies the action to this state in place, instead of building a child,
+        and returns a token that undoMove uses to restore the state exactly.
+
+        Moves must be undone in reverse order.  The state must own its food grid,
+        agent states and capsule list (a deepCopy() does), since they are edited
+        directly.  States visited this way are not reported to the explored tracker.
+        validate is as in getNextState.
+        """
+        if self.isWin() or self.isLose():
+            raise Exception('Can\'t generate a child of a terminal state.')
+
+        data = self.data
+        if agentIndex == 0:  # Pacman can eat a capsule or any ghost
+            agents = [(index, agentState.configuration, agentState.scaredTimer)
+                      for index, agentState in enumerate(data.agentStates)]
+        else:                # A ghost only changes itself
+            agentState = data.agentStates[agentIndex]
+            agents = [(agentIndex, agentState.configuration, agentState.scaredTimer)]
+        token = (agents, data.capsules, data.foodPositions, data.score, data.scoreChange,
+                 data._eaten, data._agentMoved, data._foodEaten, data._capsuleEaten, data.zobrist)
+
+        data._foodEaten = None
+        data._capsuleEaten = None
+        data.scoreChange = 0
+        self._applyMove(agentIndex, action, inPlace=True, validate=validate)
+        return token
+
+    def undoMove(self, token):
+        """
+        Restores the state as it was before the makeMove call that returned token.
+        """
+        data = self.data
+        (agents, capsules, foodPositions, score, scoreChange,
+         eaten, agentMoved, foodEaten, capsuleEaten, zobrist) = token
+        for index, configuration, scaredTimer in agents:
+            agentState = data.getWritableAgentState(index)
+            agentState.configuration = configuration
+            agentState.scaredTimer = scaredTimer
+        if data._foodEaten is not None:
+            x, y = data._foodEaten
+            data.food[x][y] = True
+        data.capsules = capsules
+        data.foodPositions = foodPositions
+        data.score = score
+        data.scoreChange = scoreChange
+        data._eaten = eaten
+        data._agentMoved = agentMoved
+        data._foodEaten = foodEaten
+        data._capsuleEaten = capsuleEaten
+        data.zobrist = zobrist
+        data._win = False
+        data._lose = False
+
+    def _applyMove(self, agentIndex, action, inPlace=False, validate=True, nextConfiguration=None):
+        """
+        Applies the effects of an action on this state's data.  Shared by
+        getNextState and getSuccessors (on a fresh copy) and makeMove (in place).
+        nextConfiguration, when given, is where the action takes the agent.
+        """
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            state.data._eaten = [False for i in range(state.getNumAgents())]
-            PacmanRules.applyAction(state, action)
+            self.data._eaten = [False for i in range(self.getNumAgents())]
+            PacmanRules.applyAction(self, action, inPlace, validate, nextConfiguration)
         else:                # A ghost is moving
-            GhostRules.applyAction(state, action, agentIndex)
+            GhostRules.applyAction(self, action, agentIndex, validate, nextConfiguration)
 
         # Time passes
         if agentIndex == 0:
-            state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
+            self.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(self, agentIndex)
 
         # Resolve multi-agent effects
-        GhostRules.checkDeath(state, agentIndex)
+        GhostRules.checkDeath(self, agentIndex)
 
         # Book keeping
-        state.data._agentMoved = agentIndex
-        state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
-        return state
+        self.data._agentMoved = agentIndex
+        self.data.score += self.data.scoreChange
 
     def getLegalPacmanActions(self):
         return self.getLegalActions(0)
@@ -156,7 +275,7 @@ class GameState:
         return self.data.agentStates[0].getPosition()
 
     def getGhostStates(self):
-        return self.data.agentStates[1:]
+        return list(self.data.agentStates[1:])
 
     def getGhostState(self, agentIndex):
         if agentIndex == 0 or agentIndex >= self.getNumAgents():
@@ -184,7 +303,14 @@ class GameState:
         return self.data.capsules
 
     def getNumFood(self):
-        return self.data.food.count()
+        return len(self.data.foodPositions)
+
+    def getFoodList(self):
+        """
+        Returns a list of positions (x,y) of the remaining food, in the same
+        order as getFood().asList(), without scanning the grid.
+        """
+        return list(self.data.foodPositions)
 
     def getFood(self):
         """
@@ -253,6 +379,140 @@ class GameState:
         """
         return hash(self.data)
 
+    def getKey(self):
+        """
+        Returns the 64-bit Zobrist key of the state, suitable as a
+        transposition-table key.  Updated incrementally on every move.
+        """
+        return self.data.getKey()
+
+    # GameState.encode: a header, a record per agent, then the food and capsule bitmasks
+    ENCODING_VERSION = 1
+    # version, layout id, Zobrist key without the score, agents, flags, agent moved, score
+    ENCODING_HEADER = struct.Struct('<BQQBBBd')
+    # flags, direction, 2 * x, 2 * y, scared timer, food carried, food returned
+    ENCODING_AGENT = 'BBhhHHH'
+    ENCODING_AGENTS = {}    # Number of agents -> struct.Struct of their records
+    ENCODING_DIRECTIONS = (Directions.NORTH, Directions.SOUTH, Directions.EAST,
+                           Directions.WEST, Directions.STOP)
+    ENCODING_DIRECTION_INDEX = dict((direction, index) for index, direction
+                                    in enumerate(ENCODING_DIRECTIONS))
+    WIN, LOSE, FLOAT_SCORE = 1, 2, 4                   # State flags
+    IS_PACMAN, EATEN, NO_CONFIGURATION = 1, 2, 4       # Agent flags
+    NO_AGENT_MOVED = 255
+
+    def getAgentsStruct(numAgents):
+        if numAgents not in GameState.ENCODING_AGENTS:
+            GameState.ENCODING_AGENTS[numAgents] = struct.Struct(
+                '<' + GameState.ENCODING_AGENT * numAgents)
+        return GameState.ENCODING_AGENTS[numAgents]
+    getAgentsStruct = staticmethod(getAgentsStruct)
+
+    def encode(self):
+        """
+        Returns a compact binary encoding of the state (bytes), which
+        GameState.decode turns back into an equal state, with the same key.
+
+        The layout is not encoded, only its id (Layout.getLayoutId): the
+        decoding process must have the layout registered (layout.registerLayout).
+        Agent positions, directions, scared timers, food and remaining capsules
+        (as bitmasks), score, win/lose flags and the Zobrist key are encoded;
+        what the display alone uses about the last move (food or capsule eaten,
+        score change) is not.
+        """
+        data = self.data
+        stateLayout = data.layout
+        zobrist = data.zobrist
+        if zobrist is None:
+            zobrist = stateLayout.getZobristTable().stateKey(data)
+        flags = (data._win and self.WIN) | (data._lose and self.LOSE)
+        if type(data.score) is not int:
+            flags |= self.FLOAT_SCORE
+        agentMoved = self.NO_AGENT_MOVED if data._agentMoved is None else data._agentMoved
+        header = self.ENCODING_HEADER.pack(self.ENCODING_VERSION, stateLayout.getLayoutId(), zobrist,
+                                           len(data.agentStates), flags, agentMoved, data.score)
+
+        fields = []
+        directionIndex = self.ENCODING_DIRECTION_INDEX
+        for agentState, eaten in zip(data.agentStates, data._eaten):
+            agentFlags = (agentState.isPacman and self.IS_PACMAN) | (eaten and self.EATEN)
+            configuration = agentState.configuration
+            if configuration is None:
+                fields += (agentFlags | self.NO_CONFIGURATION, 0, 0, 0)
+            else:
+                x, y = configuration.pos
+                # Scared ghosts move at half speed: positions are multiples of 0.5
+                fields += (agentFlags, directionIndex[configuration.direction], int(2 * x), int(2 * y))
+            fields += (agentState.scaredTimer, agentState.numCarrying, agentState.numReturned)
+        agents = self.getAgentsStruct(len(data.agentStates)).pack(*fields)
+
+        food = data.food.getBits().to_bytes((stateLayout.width * stateLayout.height + 7) // 8, 'little')
+        capsuleBits = 0
+        for index, position in enumerate(stateLayout.capsules):
+            if position in data.capsules:
+                capsuleBits |= 1 << index
+        capsules = capsuleBits.to_bytes((len(stateLayout.capsules) + 7) // 8, 'little')
+        return header + agents + food + capsules
+
+    def decode(encoded):
+        """
+        Rebuilds the state encoded by GameState.encode.
+        """
+        (version, layoutId, zobrist, numAgents, flags,
+         agentMoved, score) = GameState.ENCODING_HEADER.unpack_from(encoded)
+        if version != GameState.ENCODING_VERSION:
+            raise Exception('Unknown GameState encoding version: %d' % version)
+        stateLayout = layout.getRegisteredLayout(layoutId)
+        offset = GameState.ENCODING_HEADER.size
+        agentsStruct = GameState.getAgentsStruct(numAgents)
+        fields = agentsStruct.unpack_from(encoded, offset)
+        offset += agentsStruct.size
+
+        agentStates = []
+        eatenAgents = []
+        recordSize = len(GameState.ENCODING_AGENT)
+        for index in range(numAgents):
+            (agentFlags, direction, x2, y2, scaredTimer, numCarrying,
+             numReturned) = fields[index * recordSize:(index + 1) * recordSize]
+            start = Configuration(stateLayout.agentPositions[index][1], Directions.STOP)
+            agentState = AgentState(start, agentFlags & GameState.IS_PACMAN != 0)
+            if agentFlags & GameState.NO_CONFIGURATION:
+                agentState.configuration = None
+            else:
+                # Whole coordinates come back as ints, like the layout's
+                x = x2 >> 1 if x2 & 1 == 0 else x2 / 2
+                y = y2 >> 1 if y2 & 1 == 0 else y2 / 2
+                agentState.configuration = Configuration((x, y), GameState.ENCODING_DIRECTIONS[direction])
+            agentState.scaredTimer = scaredTimer
+            agentState.numCarrying = numCarrying
+            agentState.numReturned = numReturned
+            agentStates.append(agentState)
+            eatenAgents.append(agentFlags & GameState.EATEN != 0)
+
+        foodBytes = (stateLayout.width * stateLayout.height + 7) // 8
+        food = stateLayout.food.__class__(stateLayout.width, stateLayout.height)
+        food.setBits(int.from_bytes(encoded[offset:offset + foodBytes], 'little'))
+        offset += foodBytes
+        capsuleBits = int.from_bytes(encoded[offset:], 'little')
+
+        state = GameState()
+        data = state.data
+        data.food = food
+        data.foodPositions = tuple(food.asList())
+        data.capsules = [position for index, position in enumerate(stateLayout.capsules)
+                         if capsuleBits >> index & 1]
+        data.agentStates = tuple(agentStates)
+        data._writableAgents = (1 << numAgents) - 1
+        data.layout = stateLayout
+        data._eaten = eatenAgents
+        data.score = score if flags & GameState.FLOAT_SCORE else int(score)
+        data.zobrist = zobrist
+        data._agentMoved = None if agentMoved == GameState.NO_AGENT_MOVED else agentMoved
+        data._win = flags & GameState.WIN != 0
+        data._lose = flags & GameState.LOSE != 0
+        return state
+    decode = staticmethod(decode)
+
     def __str__(self):
 
         return str(self.data)
@@ -263,6 +523,45 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+
+class ExploredCounter:
+    """
+    An explored tracker (see GameState.setExploredTracker) that counts the
+    distinct states explored.  It keeps their 64-bit keys (GameState.getKey)
+    instead of the states, so it holds no reference to them.
+    """
+
+    def __init__(self):
+        self.keys = set()
+
+    def add(self, state):
+        self.keys.add(state.getKey())
+
+    def getAndReset(self):
+        keys, self.keys = self.keys, set()
+        return keys
+
+
+class ThreadLocalExploredCounter:
+    """
+    An ExploredCounter per thread: states explored by a search running in
+    one thread are not counted in (or reset by) the others.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def getCounter(self):
+        if not hasattr(self.local, 'counter'):
+            self.local.counter = ExploredCounter()
+        return self.local.counter
+
+    def add(self, state):
+        self.getCounter().add(state)
+
+    def getAndReset(self):
+        return self.getCounter().getAndReset()
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -349,52 +648,73 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(state.getPacmanState().configuration, state.data.layout.walls)
+        configuration = state.data.agentStates[0].configuration
+        actions = state.data.layout.getMoveTable().pacmanActions.get(configuration.pos)
+        if actions is None:
+            return Actions.getPossibleActions(configuration, state.data.layout.walls)
+        return list(actions)
     getLegalActions = staticmethod(getLegalActions)
 
-    def applyAction(state, action):
+    def applyAction(state, action, inPlace=False, validate=True, nextConfiguration=None):
         """
-        Edits the state to reflect the results of the action.
+        Edits the state to reflect the results of the action.  With inPlace, the
+        food grid is edited directly instead of being copied first.  Without
+        validate, the action is trusted to be legal.  nextConfiguration, when
+        given, is the configuration the action leads to.
         """
-        legal = PacmanRules.getLegalActions(state)
-        if action not in legal:
-            raise Exception("Illegal action " + str(action))
+        if validate:
+            legal = PacmanRules.getLegalActions(state)
+            if action not in legal:
+                raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.getWritableAgentState(0)
+        table = state.data.layout.getZobristTable()
+        oldKey = table.agentKey(0, pacmanState)
 
         # Update Configuration
-        vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
-        pacmanState.configuration = pacmanState.configuration.getNextState(
-            vector)
+        if nextConfiguration is None:
+            nextConfiguration = state.data.layout.getMoveTable().getNextConfigurations(
+                pacmanState.configuration, [action], PacmanRules.PACMAN_SPEED)[0]
+        pacmanState.configuration = nextConfiguration
+        state.data.zobrist ^= oldKey ^ table.agentKey(0, pacmanState)
 
         # Eat
         next = pacmanState.configuration.getPosition()
         nearest = nearestPoint(next)
         if manhattanDistance(nearest, next) <= 0.5:
             # Remove food
-            PacmanRules.consume(nearest, state)
+            PacmanRules.consume(nearest, state, inPlace)
     applyAction = staticmethod(applyAction)
 
-    def consume(position, state):
+    def consume(position, state, inPlace=False):
         x, y = position
+        table = state.data.layout.getZobristTable()
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
+            if not inPlace:
+                state.data.food = state.data.food.copy()
             state.data.food[x][y] = False
+            state.data.zobrist ^= table.foodKey(x, y)
             state.data._foodEaten = position
-            # TODO: cache numFood?
-            numFood = state.getNumFood()
-            if numFood == 0 and not state.data._lose:
+            foodPositions = state.data.foodPositions
+            index = bisect.bisect_left(foodPositions, position)
+            state.data.foodPositions = foodPositions[:index] + foodPositions[index + 1:]
+            if len(state.data.foodPositions) == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            # Never edit the list in place: undoMove restores the previous one
+            state.data.capsules = [c for c in state.data.capsules if c != position]
             state.data._capsuleEaten = position
+            state.data.zobrist ^= table.capsuleKey(position)
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                ghostState = state.data.getWritableAgentState(index)
+                oldKey = table.agentKey(index, ghostState)
+                ghostState.scaredTimer = SCARED_TIME
+                state.data.zobrist ^= oldKey ^ table.agentKey(index, ghostState)
     consume = staticmethod(consume)
 
 
@@ -411,6 +731,9 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
+        actions = state.data.layout.getMoveTable().ghostActions.get(conf.pos)
+        if actions is not None:
+            return list(actions[conf.direction])
         possibleActions = Actions.getPossibleActions(conf, state.data.layout.walls)
         reverse = Actions.reverseDirection(conf.direction)
         if Directions.STOP in possibleActions:
@@ -420,27 +743,45 @@ class GhostRules:
         return possibleActions
 
     @staticmethod
-    def applyAction(state, action: str, ghostIndex: int):
-
-        legal = GhostRules.getLegalActions(state, ghostIndex)
-        if action not in legal:
-            raise Exception("Illegal ghost action " + str(action))
-
-        ghostState = state.data.agentStates[ghostIndex]
+    def getSpeed(ghostState):
+        """
+        Scared ghosts move at half speed.
+        """
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0:
             speed /= 2.0
-        vector = Actions.directionToVector(action, speed)
-        ghostState.configuration = ghostState.configuration.getNextState(
-            vector)
-    
+        return speed
+
+    @staticmethod
+    def applyAction(state, action: str, ghostIndex: int, validate=True, nextConfiguration=None):
+
+        if validate:
+            legal = GhostRules.getLegalActions(state, ghostIndex)
+            if action not in legal:
+                raise Exception("Illegal ghost action " + str(action))
+
+        ghostState = state.data.getWritableAgentState(ghostIndex)
+        table = state.data.layout.getZobristTable()
+        oldKey = table.agentKey(ghostIndex, ghostState)
+        if nextConfiguration is None:
+            nextConfiguration = state.data.layout.getMoveTable().getNextConfigurations(
+                ghostState.configuration, [action], GhostRules.getSpeed(ghostState))[0]
+        ghostState.configuration = nextConfiguration
+        state.data.zobrist ^= oldKey ^ table.agentKey(ghostIndex, ghostState)
+
     @staticmethod
-    def decrementTimer(ghostState):
-        timer = ghostState.scaredTimer
+    def decrementTimer(state, ghostIndex):
+        timer = state.data.agentStates[ghostIndex].scaredTimer
+        if timer == 0:
+            return
+        ghostState = state.data.getWritableAgentState(ghostIndex)
+        table = state.data.layout.getZobristTable()
+        oldKey = table.agentKey(ghostIndex, ghostState)
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint(
-                ghostState.configuration.pos)
-        ghostState.scaredTimer = max(0, timer - 1)
+            ghostState.configuration = Configuration(nearestPoint(
+                ghostState.configuration.pos), ghostState.configuration.direction)
+        ghostState.scaredTimer = timer - 1
+        state.data.zobrist ^= oldKey ^ table.agentKey(ghostIndex, ghostState)
 
     @staticmethod
     def checkDeath(state, agentIndex):
@@ -460,11 +801,17 @@ class GhostRules:
     @staticmethod
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
+            ghostState = state.data.getWritableAgentState(agentIndex)
+            table = state.data.layout.getZobristTable()
+            oldKey = table.agentKey(agentIndex, ghostState)
             state.data.scoreChange += 200
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
+            state.data.zobrist ^= oldKey ^ table.agentKey(agentIndex, ghostState)
             # Added for first-person
-            state.data._eaten[agentIndex] = True
+            eaten = state.data._eaten[:]  # May be shared with the parent state
+            eaten[agentIndex] = True
+            state.data._eaten = eaten
         else:
             if not state.data._win:
                 state.data.scoreChange -= 500
@@ -554,6 +901,8 @@ def readCommand(argv):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--bitboards', action='store_true', dest='bitboards',
+                      help='Store walls and food in bit-packed grids', default=False)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -565,7 +914,7 @@ def readCommand(argv):
         random.seed('cs188')
 
     # Choose a layout
-    args['layout'] = layout.getLayout(options.layout)
+    args['layout'] = layout.getLayout(options.layout, bitboards=options.bitboards)
     if args['layout'] == None:
         raise Exception("The layout " + options.layout + " cannot be found")
 
@@ -50,8 +50,8 @@ class GreedyAgent(Agent):
         if Directions.STOP in legal:
             legal.remove(Directions.STOP)
 
-        children = [(state.getNextState(0, action), action)
-                      for action in legal]
+        children = [(child, action)
+                    for action, child in state.getSuccessors(0, legal)]
         scored = [(self.evaluationFunction(state), action)
                   for state, action in children]
         bestScore = max(scored)[0]